@@ -4,30 +4,33 @@
 Template for SNAP Dash apps.
 """
 import os
-import json
-import plotly.graph_objs as go
-import xarray as xr
-import dash
 from dash import dcc, html
-import dash_dangerously_set_inner_html as ddsih
-import pandas as pd
-import geopandas as gpd
 import numpy as np
-import urllib, json
-import re
-from dash.dependencies import Input, Output, State
-from apps import common
+from dash.dependencies import Input, Output
+from apps import (
+    browsercache,
+    common,
+    communities,
+    datastore,
+    dayofyear,
+    encoding,
+    executor,
+    figcache,
+    metrics,
+    patches,
+)
 from application import app
 
 path_prefix = os.environ["DASH_REQUESTS_PATHNAME_PREFIX"]
 
 data_prefix = "https://s3-us-west-2.amazonaws.com/community-logs-data/"
 
+days = np.array(dayofyear.day_categories, dtype=object)
+
 # AWS Elastic Beanstalk looks for application by default,
 # if this variable (application) isn't set you will get a WSGI error.
 
-communities = gpd.read_file("CommunityList.json")
-names = list(communities.LocationName)
+names = communities.names()
 
 community_layout = dcc.Dropdown(
     id="community",
@@ -62,7 +65,8 @@ config = {
 }
 
 graph_layout = html.Div(
-    className="container", children=[dcc.Graph(id="acharts", config=config)]
+    className="container",
+    children=[dcc.Graph(id="acharts", config=config)] + browsercache.stores("acharts"),
 )
 
 form_elements_section = html.Div(
@@ -126,17 +130,7 @@ This graph shows modeled data based on the coldest temperature ever recorded or
 
 
 def add_traces(community, gcm, figure):
-    community_name = re.sub("[^A-Za-z0-9]+", "", community) + "_" + gcm
-    comm_filename = community_name
-
-    df = pd.read_csv(
-        "https://s3-us-west-2.amazonaws.com/community-logs-data/min/"
-        + comm_filename
-        + "_min.csv"
-    )
-    imperial_conversion_lu = {"temp": 1.8, "precip": 0.0393701}
-    df["temp"] = df["temp"] * imperial_conversion_lu["temp"] + 32
-    df["time"] = pd.to_datetime(df["time"], format="%Y-%m-%d")
+    df = datastore.load_series(community, gcm, "min")
     years = {}
     if gcm == "ERA":
         for i in range(1980, 2010, 30):
@@ -150,52 +144,78 @@ def add_traces(community, gcm, figure):
         "2040": "#6baed6",
         "2070": "#2171b5",
     }
-    for key in sorted(years):
-        df_t = df[df["time"].dt.year >= int(key)]
-        df_annual = df_t[df_t["time"].dt.year < int(key) + 30]
+    periods = sorted(years)
+    with metrics.timed("compute"):
+        mins = dayofyear.by_period(df, periods, 30, "min")
+    for key, ds_min in zip(periods, mins):
         if gcm == "ERA":
             title = str(key) + "-" + str(key + 29) + " "
         else:
             title = str(key) + "-" + str(key + 29) + " "
-        dx = df_annual.set_index("time")
-        dxx = dx.to_xarray()
-        month_day_str = xr.DataArray(
-            dxx.indexes["time"].strftime("%m-%d"),
-            coords=dxx.coords,
-            name="month_day_str",
-        )
-        ds_min = dxx.groupby(month_day_str).min()
+        has_data = ~np.isnan(ds_min)
         figure["data"].append(
             {
-                "x": month_day_str.values,
-                "y": ds_min["temp"].values,
+                "x": days[has_data],
+                "y": ds_min[has_data],
                 "hoverinfo": "y",
                 "name": title,
-                "text": ds_min["temp"].values,
+                "text": ds_min[has_data],
                 "mode": "markers",
                 "marker": {"color": decade_lu[str(key)]},
             }
         )
 
 
-@app.callback(
-    Output("acharts", "figure"),
-    inputs=[Input("community", "value"), Input("gcm", "value")],
-)
-def temp_chart(community, gcm):
-    figure = {}
-    figure["data"] = []
-    add_traces(community, "ERA", figure)
-    add_traces(community, gcm, figure)
+# One trace per 30-year period charted from the ERA data, ahead of the GCM
+# traces.
+historical_count = len(range(1980, 2010, 30))
 
-    layout = {
-        "title": "Daily Minimum Temps ("
+
+def chart_title(community, gcm):
+    return (
+        "Daily Minimum Temps ("
         + unit_lu["temp"]["imperial"]
         + ")<br>"
         + community
         + ", Alaska, Historical and Projected ["
         + gcm
-        + "] model",
+        + "] model"
+    )
+
+
+@figcache.memoize("annual_min.projected")
+def projected_traces(community, gcm):
+    projected = {"data": []}
+    add_traces(community, gcm, projected)
+    return encoding.encode_traces(projected["data"])
+
+
+@metrics.traced("annual_min")
+def temp_chart(community, gcm):
+    if patches.only_changed("gcm"):
+        return patches.replace_traces(
+            historical_count,
+            projected_traces(community, gcm),
+            chart_title(community, gcm),
+        )
+    return build_chart(community, gcm)
+
+
+@figcache.memoize("annual_min")
+def build_chart(community, gcm):
+    figure = {}
+    historical = {"data": []}
+    projected = {"data": []}
+    executor.run_all(
+        [
+            ("annual_min.ERA", add_traces, (community, "ERA", historical)),
+            ("annual_min." + gcm, add_traces, (community, gcm, projected)),
+        ]
+    )
+    figure["data"] = historical["data"] + projected["data"]
+
+    layout = {
+        "title": chart_title(community, gcm),
         "hovermode": "closest",
         "hoverlabel": {"namelength": 20},
         "legend": {"text": "Legend Title", "traceorder": "reversed"},
@@ -210,4 +230,13 @@ def temp_chart(community, gcm):
         "xaxis": {"fixedrange": True, "type": "category"},
     }
     figure["layout"] = layout
-    return figure
+    return encoding.encode_figure(figure)
+
+
+if browsercache.enabled:
+    browsercache.register(app, "acharts", ["community", "gcm"], build_chart)
+else:
+    app.callback(
+        Output("acharts", "figure"),
+        inputs=[Input("community", "value"), Input("gcm", "value")],
+    )(temp_chart)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the chart computations, run against synthetic
+community data of the same size and shape as the files in the bucket.
+
+    python -m apps.benchmarks [NAME ...] [--repeat 5] [--save FILE]
+                              [--compare FILE] [--tolerance 0.25]
+
+Fixture CSVs (daily °C "time,temp" rows: ERA 1980-2009, GFDL and NCAR
+2010-2100, for "min" and "mean") are generated from a fixed seed and served
+through DATA_STORE=memory, so runs are repeatable and need no network. Each
+benchmark is timed over --repeat runs after one warm-up call and then run
+once more under tracemalloc for its peak allocation. Benchmarks that draw
+chart traces read their series from the data cache, so they time the
+computation alone; "datastore.series" times parsing a file.
+
+--save writes the results as a baseline; --compare reports the change
+against one and exits with status 1 if any median is more than --tolerance
+slower.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+community = "Fairbanks"
+
+periods = {
+    "ERA": ("1980-01-01", "2009-12-31"),
+    "GFDL": ("2010-01-01", "2100-12-31"),
+    "NCAR": ("2010-01-01", "2100-12-31"),
+}
+
+
+def fixture_csv(gcm, variable, seed=0):
+    """A seasonal cycle with day-to-day noise, in the bucket's CSV format."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(*periods[gcm], freq="D")
+    warming = 0.0 if gcm == "ERA" else np.linspace(0, 4, len(days))
+    base = -5.0 if variable == "min" else 0.0
+    temp = (
+        base
+        - 20 * np.cos(2 * np.pi * (days.dayofyear.values - 15) / 365.25)
+        + warming
+        + rng.normal(0, 4, len(days))
+    )
+    return pd.DataFrame(
+        {"time": days.strftime("%Y-%m-%d"), "temp": temp.round(3)}
+    ).to_csv(index=False)
+
+
+def install_fixtures():
+    from apps import datastore
+
+    backend = datastore.MemoryBackend()
+    for seed, gcm in enumerate(datastore.models):
+        for variable in datastore.variables:
+            backend.add(
+                datastore.data_path(community, gcm, variable),
+                fixture_csv(gcm, variable, seed),
+            )
+    datastore.set_backend(backend)
+    return backend
+
+
+def benchmarks():
+    """{name: zero-argument callable} for every benchmark."""
+    os.environ.setdefault("DASH_REQUESTS_PATHNAME_PREFIX", "/")
+    from apps import (
+        annual_min,
+        cumulative_gdd,
+        datastore,
+        dayofyear,
+        gdd,
+        growing_season,
+        logs,
+    )
+
+    backend = install_fixtures()
+    # Time the live computations, not lookups in precomputed tables.
+    logs.season_table = None
+    cumulative_gdd.gdd_table = None
+
+    era_min = datastore.load_series(community, "ERA", "min")
+    gfdl_min = datastore.load_series(community, "GFDL", "min")
+    gfdl_mean = datastore.load_series(community, "GFDL", "mean")
+    era_years = [
+        frame.reset_index() for _, frame in era_min.groupby(era_min.index.year)
+    ]
+
+    def max_days_alt():
+        for year in era_years:
+            logs.get_max_days_alt(year, community, 32, "ERA")
+
+    return {
+        "datastore.series": lambda: backend.series(community, "GFDL", "min"),
+        "logs.get_max_days_alt": max_days_alt,
+        "growing_season.growing_seasons[ERA]": lambda: (
+            growing_season.growing_seasons(era_min, 32, 1980, 2010)
+        ),
+        "growing_season.growing_seasons[GFDL]": lambda: (
+            growing_season.growing_seasons(gfdl_min, 32, 2010, 2100)
+        ),
+        "logs.add_time_series": lambda: logs.add_time_series(
+            community, 32, "GFDL", {"data": []}
+        ),
+        "dayofyear.by_period[min]": lambda: dayofyear.by_period(
+            gfdl_min, [2010, 2040, 2070], 30, "min"
+        ),
+        "annual_min.add_traces": lambda: annual_min.add_traces(
+            community, "GFDL", {"data": []}
+        ),
+        "gdd.cumulative_curves": lambda: gdd.cumulative_curves(gfdl_mean, 32, "GFDL"),
+        "cumulative_gdd.add_traces": lambda: cumulative_gdd.add_traces(
+            community, 32, "GFDL", {"data": []}
+        ),
+    }
+
+
+def measure(func, repeat):
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "max": max(times),
+        "peak_kb": peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """[(name, ratio)] for benchmarks slower than baseline by > tolerance."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before and result["median"] / before["median"] > 1 + tolerance:
+            regressions.append((name, result["median"] / before["median"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    available = benchmarks()
+    unknown = [name for name in args.names if name not in available]
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(unknown))
+
+    results = {}
+    print(
+        "%-38s %10s %10s %10s %10s"
+        % ("benchmark", "median ms", "min ms", "peak KB", "vs base")
+    )
+    for name in args.names or available:
+        result = results[name] = measure(available[name], args.repeat)
+        before = baseline.get("results", {}).get(name)
+        change = (
+            "%+9.0f%%" % ((result["median"] / before["median"] - 1) * 100)
+            if before
+            else ""
+        )
+        print(
+            "%-38s %10.2f %10.2f %10.0f %10s"
+            % (
+                name,
+                result["median"] * 1000,
+                result["min"] * 1000,
+                result["peak_kb"],
+                change,
+            )
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, ratio in regressions:
+            print("REGRESSION %s: %.2fx the baseline median" % (name, ratio))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Cache of rendered chart figures in the browser's local storage.
+
+With BROWSER_CACHE=1, a clientside callback looks each chart up by (graph,
+data version, inputs) in a dcc.Store kept in local storage before anything
+is sent to the server. Only misses go to the server, and the figure it
+returns is drawn and added to the store. Entries are dropped oldest first
+once the store holds more than BROWSER_CACHE_KB (default 2048) of JSON, and
+all of them are discarded when the data version (FIGURE_CACHE_VERSION and
+the figure encoding) changes, so returning visitors see the same charts
+without a round trip until the data is updated.
+"""
+import json
+import os
+
+from dash import Input, Output, State, dcc
+from dash.exceptions import PreventUpdate
+
+from apps import encoding, figcache
+
+enabled = os.environ.get("BROWSER_CACHE", "").lower() in ("1", "true", "yes")
+max_chars = int(float(os.environ.get("BROWSER_CACHE_KB", 2048)) * 1024)
+
+version = figcache.version + "/" + encoding.mode
+
+lookup = """
+function () {
+    var inputs = Array.prototype.slice.call(arguments);
+    var version = inputs.pop();
+    var cache = inputs.pop();
+    var key = JSON.stringify([%(graph)s, version].concat(inputs));
+    if (cache && cache.version === version && cache.entries[key]) {
+        return [cache.entries[key].figure, window.dash_clientside.no_update];
+    }
+    return [window.dash_clientside.no_update, {key: key, inputs: inputs}];
+}
+"""
+
+store = """
+function (response, cache, version) {
+    if (!response) {
+        return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+    }
+    if (!cache || cache.version !== version) {
+        cache = {version: version, entries: {}, order: [], chars: 0};
+    }
+    var size = JSON.stringify(response.figure).length;
+    if (cache.entries[response.key] || size > %(max_chars)d) {
+        return [response.figure, window.dash_clientside.no_update];
+    }
+    var entries = Object.assign({}, cache.entries);
+    var order = cache.order.concat([response.key]);
+    var chars = cache.chars + size;
+    entries[response.key] = {figure: response.figure, size: size};
+    while (chars > %(max_chars)d) {
+        var oldest = order.shift();
+        chars -= entries[oldest].size;
+        delete entries[oldest];
+    }
+    return [
+        response.figure,
+        {version: version, entries: entries, order: order, chars: chars},
+    ];
+}
+"""
+
+
+def shared_stores():
+    """The cache itself and the server's data version, for the app layout."""
+    if not enabled:
+        return []
+    return [
+        dcc.Store(id="figure-cache", storage_type="local"),
+        dcc.Store(id="data-version", data=version),
+    ]
+
+
+def stores(graph_id):
+    """Per-chart stores carrying requests to and figures from the server."""
+    if not enabled:
+        return []
+    return [dcc.Store(id=graph_id + "-request"), dcc.Store(id=graph_id + "-response")]
+
+
+def register(app, graph_id, input_ids, build_chart):
+    """
+    Draw graph_id from the browser cache when it holds the figure for the
+    current values of input_ids, and from build_chart(*values) otherwise.
+    """
+    request_id = graph_id + "-request"
+    response_id = graph_id + "-response"
+    app.clientside_callback(
+        lookup % {"graph": json.dumps(graph_id)},
+        Output(graph_id, "figure"),
+        Output(request_id, "data"),
+        *[Input(input_id, "value") for input_id in input_ids],
+        State("figure-cache", "data"),
+        State("data-version", "data"),
+    )
+
+    @app.callback(Output(response_id, "data"), Input(request_id, "data"))
+    def respond(request):
+        if request is None:
+            raise PreventUpdate
+        return {"key": request["key"], "figure": build_chart(*request["inputs"])}
+
+    app.clientside_callback(
+        store % {"max_chars": max_chars},
+        Output(graph_id, "figure", allow_duplicate=True),
+        Output("figure-cache", "data", allow_duplicate=True),
+        Input(response_id, "data"),
+        State("figure-cache", "data"),
+        State("data-version", "data"),
+        prevent_initial_call=True,
+    )
@@ -0,0 +1,76 @@
+"""
+Threshold and model switching in the browser for the Growing Season and
+Growing Degree Days charts.
+
+With CLIENTSIDE_CHARTS=1, choosing a community sends one bundle holding the
+chart for every threshold and model into a dcc.Store beside the graph, and a
+clientside callback assembles the selected figure from it, so changing the
+threshold or model makes no request to the server. The bundle is put
+together from the tab's memoized build_chart, so it shares the figure cache
+(and apps.warmup) with the server-side callbacks.
+"""
+import os
+
+from dash import Input, Output, dcc
+
+enabled = os.environ.get("CLIENTSIDE_CHARTS", "").lower() in ("1", "true", "yes")
+
+gcms = ["GFDL", "NCAR"]
+
+assemble = """
+function (bundle, threshold, gcm) {
+    if (!bundle || !bundle.projected[gcm] || !bundle.projected[gcm][threshold]) {
+        return window.dash_clientside.no_update;
+    }
+    var layout = Object.assign({}, bundle.layout, {
+        title: bundle.titles[gcm][threshold],
+    });
+    return {
+        data: bundle.historical[threshold].concat(bundle.projected[gcm][threshold]),
+        layout: layout,
+    };
+}
+"""
+
+
+def bundle(build_chart, historical_count, community, thresholds):
+    """
+    Every figure for community as {"layout", "historical": {threshold:
+    traces}, "projected": {gcm: {threshold: traces}}, "titles": {gcm:
+    {threshold: title}}}, with the layout (less its title) stored once.
+    """
+    result = {
+        "layout": None,
+        "historical": {},
+        "projected": {gcm: {} for gcm in gcms},
+        "titles": {gcm: {} for gcm in gcms},
+    }
+    for threshold in thresholds:
+        for gcm in gcms:
+            figure = build_chart(community, threshold, gcm)
+            layout = dict(figure["layout"])
+            result["titles"][gcm][threshold] = layout.pop("title")
+            result["layout"] = layout
+            result["historical"][threshold] = figure["data"][:historical_count]
+            result["projected"][gcm][threshold] = figure["data"][historical_count:]
+    return result
+
+
+def stores(store_id):
+    """The dcc.Store holding the bundle, to go next to the graph."""
+    return [dcc.Store(id=store_id)] if enabled else []
+
+
+def register(app, graph_id, store_id, make_bundle):
+    """
+    Fill store_id with make_bundle(community) and draw graph_id from it in
+    the browser.
+    """
+    app.callback(Output(store_id, "data"), Input("community", "value"))(make_bundle)
+    app.clientside_callback(
+        assemble,
+        Output(graph_id, "figure"),
+        Input(store_id, "data"),
+        Input("threshold", "value"),
+        Input("gcm", "value"),
+    )
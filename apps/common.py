@@ -1,7 +1,4 @@
 import os
-import re
-import pandas as pd
-import xarray as xr
 from dash import dcc, html
 
 path_prefix = os.environ["DASH_REQUESTS_PATHNAME_PREFIX"]
@@ -0,0 +1,52 @@
+"""
+Registry of the communities offered by the tabs.
+
+CommunityList.json is parsed once, on first use, with the json module into
+one record per community holding its name, coordinates and the file name
+stem its data is stored under (e.g. "Fort Yukon" -> "FortYukon").
+"""
+import functools
+import json
+import os
+import re
+from collections import namedtuple
+
+default_path = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CommunityList.json"
+)
+
+Community = namedtuple("Community", ["name", "longitude", "latitude", "stem"])
+
+
+def slug(name):
+    return re.sub("[^A-Za-z0-9]+", "", name)
+
+
+@functools.lru_cache(maxsize=None)
+def load(path=default_path):
+    """Communities in file order, and the same keyed by name."""
+    with open(path) as f:
+        features = json.load(f)["features"]
+    found = []
+    for feature in features:
+        name = feature["properties"]["LocationName"]
+        longitude, latitude = feature["geometry"]["coordinates"][:2]
+        found.append(Community(name, longitude, latitude, slug(name)))
+    return found, {record.name: record for record in found}
+
+
+def records(path=default_path):
+    return load(path)[0]
+
+
+def names(path=default_path):
+    return [record.name for record in records(path)]
+
+
+def get(name):
+    return load()[1].get(name)
+
+
+def stem(name):
+    record = get(name)
+    return record.stem if record is not None else slug(name)
@@ -4,29 +4,35 @@
 Template for SNAP Dash apps.
 """
 import os
-import json
-import plotly.graph_objs as go
-import xarray as xr
-import dash
 from dash import dcc, html, dash_table
-import dash_dangerously_set_inner_html as ddsih
 import pandas as pd
-import geopandas as gpd
-import numpy as np
-import urllib, json
-import re
-from dash.dependencies import Input, Output, State
-from apps import common
+from dash.dependencies import Input, Output
+from apps import (
+    browsercache,
+    clientside,
+    common,
+    communities,
+    datastore,
+    encoding,
+    executor,
+    figcache,
+    gdd,
+    metrics,
+    patches,
+)
 from application import app
 
 path_prefix = os.environ["DASH_REQUESTS_PATHNAME_PREFIX"]
 
 data_prefix = "https://s3-us-west-2.amazonaws.com/community-logs-data/"
 
-communities = gpd.read_file("CommunityList.json")
-names = list(communities.LocationName)
+names = communities.names()
+
+gdd_table_data = pd.read_csv("gdd.csv", dtype=str, keep_default_na=False)
 
-gdd_table_data = gpd.read_file("gdd.csv")
+# Precomputed curves (python -m apps.precompute gdd); thresholds it does not
+# cover are computed live.
+gdd_table = gdd.load_table(os.environ.get("GDD_TABLE"))
 
 community_layout = dcc.Dropdown(
     id="community",
@@ -91,7 +97,9 @@ data_table = dash_table.DataTable(
 )
 
 graph_layout = html.Div(
-    className="container", children=[dcc.Graph(id="ccharts", config=config)]
+    className="container",
+    children=[dcc.Graph(id="ccharts", config=config)]
+    + (clientside.stores("cbundle") or browsercache.stores("ccharts")),
 )
 
 form_elements_section = html.Div(
@@ -183,42 +191,16 @@ Example: Corn—with a baseline temperature of 50°F and over 2,000 GDD necessar
 
 
 def add_traces(community, threshold, gcm, figure):
-    community_name = re.sub("[^A-Za-z0-9]+", "", community) + "_" + gcm
-    comm_filename = community_name
-
-    df = pd.read_csv(
-        "https://s3-us-west-2.amazonaws.com/community-logs-data/mean/"
-        + comm_filename
-        + "_mean.csv",
-        index_col="time",
-    )
-    # df = pd.read_csv('./mean/' + comm_filename + '_mean.csv', index_col = 'time')
-    imperial_conversion_lu = {"temp": 1.8, "precip": 0.0393701}
-    df["temp"] = df["temp"] * imperial_conversion_lu["temp"] + 32
-    if gcm == "ERA":
-        minyear = 1980
-        maxyear = 2010
-    else:
-        minyear = 2010
-        maxyear = 2101
-    dx = df.to_xarray()
-    # dx.rename({community_name: 'temp'},inplace=True)
-    dx["time"] = pd.to_datetime(dx["time"], format="%Y-%m-%d")
-    for i in range(minyear, maxyear - 9, 10):
-        dx_decade = dx.temp[dx["time"].dt.year >= i]
-        dx_decade = dx_decade[dx_decade["time"].dt.year < i + 10]
-        month_day_str = xr.DataArray(
-            dx_decade.indexes["time"].strftime("%m-%d"),
-            coords=dx_decade.coords,
-            name="month_day_str",
-        )
-        dx_mean = dx_decade.groupby(month_day_str).mean()
-        df_pre = dx_mean[dx_mean.values > threshold]
-        df_pre_thresh = df_pre - threshold
-        df_cumsum = df_pre_thresh.cumsum()
-        df_df = df_cumsum.to_dataframe()
-        df_df.at["12-31", "temp"] = df_cumsum.max()
-
+    minyear, maxyear = gdd.year_ranges[gcm]
+    curves = None
+    if gdd_table is not None:
+        with metrics.timed("compute"):
+            curves = gdd_table.lookup(community, gcm, threshold)
+    if curves is None:
+        df = datastore.load_series(community, gcm, "mean")
+        with metrics.timed("compute"):
+            curves = gdd.cumulative_curves(df, threshold, gcm)
+    for i, x, y in curves:
         if gcm == "ERA":
             linecolor = "#2d2d2d"
         else:
@@ -228,8 +210,8 @@ def add_traces(community, threshold, gcm, figure):
             linecolor = "rgb(" + str(yearr) + "," + str(yearg) + "," + str(yearb) + ")"
         figure["data"].append(
             {
-                "x": df_df.index.values,
-                "y": df_df["temp"],
+                "x": x,
+                "y": y,
                 "hoverinfo": "text+y",
                 "name": str(i) + "-" + str(i + 9),
                 "text": str(i) + "-" + str(i + 9),
@@ -239,21 +221,13 @@ def add_traces(community, threshold, gcm, figure):
         )
 
 
-@app.callback(
-    Output("ccharts", "figure"),
-    inputs=[
-        Input("community", "value"),
-        Input("threshold", "value"),
-        Input("gcm", "value"),
-    ],
-)
-def temp_chart(community, threshold, gcm):
-    figure = {}
-    figure["data"] = []
-    add_traces(community, threshold, "ERA", figure)
-    add_traces(community, threshold, gcm, figure)
-    layout = {
-        "title": "Cumulative Growing Degrees above "
+# One trace per decade charted from the ERA data, ahead of the GCM traces.
+historical_count = len(gdd.decades("ERA"))
+
+
+def chart_title(community, threshold, gcm):
+    return (
+        "Cumulative Growing Degrees above "
         + str(threshold)
         + unit_lu["temp"]["imperial"]
         + "<br>"
@@ -261,7 +235,50 @@ def temp_chart(community, threshold, gcm):
         + ", Alaska"
         + ", Historical and Projected ["
         + gcm
-        + "] model",
+        + "] model"
+    )
+
+
+@figcache.memoize("cumulative_gdd.projected")
+def projected_traces(community, threshold, gcm):
+    projected = {"data": []}
+    add_traces(community, threshold, gcm, projected)
+    return encoding.encode_traces(projected["data"])
+
+
+@metrics.traced("cumulative_gdd")
+def temp_chart(community, threshold, gcm):
+    if patches.only_changed("gcm"):
+        return patches.replace_traces(
+            historical_count,
+            projected_traces(community, threshold, gcm),
+            chart_title(community, threshold, gcm),
+        )
+    return build_chart(community, threshold, gcm)
+
+
+@figcache.memoize("cumulative_gdd")
+def build_chart(community, threshold, gcm):
+    figure = {}
+    historical = {"data": []}
+    projected = {"data": []}
+    executor.run_all(
+        [
+            (
+                "cumulative_gdd.ERA",
+                add_traces,
+                (community, threshold, "ERA", historical),
+            ),
+            (
+                "cumulative_gdd." + gcm,
+                add_traces,
+                (community, threshold, gcm, projected),
+            ),
+        ]
+    )
+    figure["data"] = historical["data"] + projected["data"]
+    layout = {
+        "title": chart_title(community, threshold, gcm),
         "hovermode": "closest",
         "hoverlabel": {"namelength": 20},
         "legend": {"text": "Legend Title", "traceorder": "reversed"},
@@ -671,4 +688,25 @@ def temp_chart(community, threshold, gcm):
         })
     """
     figure["layout"] = layout
-    return figure
+    return encoding.encode_figure(figure)
+
+
+def chart_bundle(community):
+    return clientside.bundle(build_chart, historical_count, community, gdd.thresholds)
+
+
+if clientside.enabled:
+    clientside.register(app, "ccharts", "cbundle", chart_bundle)
+elif browsercache.enabled:
+    browsercache.register(
+        app, "ccharts", ["community", "threshold", "gcm"], build_chart
+    )
+else:
+    app.callback(
+        Output("ccharts", "figure"),
+        inputs=[
+            Input("community", "value"),
+            Input("threshold", "value"),
+            Input("gcm", "value"),
+        ],
+    )(temp_chart)
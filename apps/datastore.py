@@ -0,0 +1,250 @@
+"""
+Data access for the per-community temperature CSVs.
+
+Chart modules ask for a (community, gcm, variable) file and get a DataFrame
+back; where the bytes come from is decided by the configured backend:
+
+    DATA_STORE=s3       read from the public S3 bucket over HTTP (default), or
+                        from DATA_STORE_PATH as the bucket URL, via apps.fetch
+    DATA_STORE=local    read from a local mirror of the bucket at DATA_STORE_PATH
+    DATA_STORE=memory   read from in-memory fixtures registered with add()
+    DATA_STORE=columnar read preconverted float32 arrays written by
+                        `python -m apps.preprocess` at DATA_STORE_PATH
+    DATA_STORE=cube     memory-map the single array written by
+                        `python -m apps.preprocess --format cube`
+
+Parsed, unit-converted series are kept in a process-wide LRU cache sized by
+DATA_CACHE_MB (default 256) with an optional DATA_CACHE_TTL in seconds, and
+concurrent requests for the same series share a single load.
+"""
+import io
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from apps import communities, fetch, metrics
+from apps.cache import LRUCache, SingleFlight
+
+data_prefix = "https://s3-us-west-2.amazonaws.com/community-logs-data/"
+
+models = ["ERA", "GFDL", "NCAR"]
+variables = ["min", "mean"]
+
+imperial_conversion_lu = {"temp": 1.8, "precip": 0.0393701}
+
+
+def community_stem(community):
+    return communities.stem(community)
+
+
+def data_path(community, gcm, variable):
+    # e.g. min/Fairbanks_ERA_min.csv, mirroring the bucket layout
+    return (
+        variable + "/" + community_stem(community) + "_" + gcm + "_" + variable + ".csv"
+    )
+
+
+def parse_series(df):
+    # Raw files hold °C with ISO date strings; charts want °F on a DatetimeIndex.
+    df["temp"] = df["temp"] * imperial_conversion_lu["temp"] + 32
+    df["time"] = pd.to_datetime(df["time"], format="%Y-%m-%d")
+    return df.set_index("time")[["temp"]]
+
+
+class CSVBackend:
+    def series(self, community, gcm, variable):
+        with metrics.timed("parse"):
+            return parse_series(self.read_csv(data_path(community, gcm, variable)))
+
+
+class S3Backend(CSVBackend):
+    def __init__(self, prefix=data_prefix):
+        self.prefix = prefix
+
+    def read_csv(self, path, **kwargs):
+        return pd.read_csv(io.BytesIO(fetch.get_bytes(self.prefix + path)), **kwargs)
+
+
+class LocalBackend(CSVBackend):
+    def __init__(self, root):
+        self.root = root
+
+    def read_csv(self, path, **kwargs):
+        return pd.read_csv(os.path.join(self.root, path), **kwargs)
+
+
+class MemoryBackend(CSVBackend):
+    def __init__(self, files=None):
+        self.files = {}
+        for path, data in (files or {}).items():
+            self.add(path, data)
+
+    def add(self, path, data):
+        # Fixtures are kept as CSV text so read_csv kwargs behave as for files.
+        if isinstance(data, pd.DataFrame):
+            data = data.to_csv(index=False)
+        elif isinstance(data, bytes):
+            data = data.decode("utf-8")
+        self.files[path] = data
+
+    def read_csv(self, path, **kwargs):
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return pd.read_csv(io.StringIO(self.files[path]), **kwargs)
+
+
+def columnar_path(community, gcm, variable):
+    return (
+        variable + "/" + community_stem(community) + "_" + gcm + "_" + variable + ".npy"
+    )
+
+
+class ColumnarBackend:
+    """
+    Reads the store written by apps.preprocess: one float32 °F array per
+    community file plus one day index per model, shared by all communities.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def day_index(self, gcm):
+        with self._lock:
+            if gcm not in self._indexes:
+                days = np.load(os.path.join(self.root, "index", gcm + ".npy"))
+                self._indexes[gcm] = pd.DatetimeIndex(
+                    days.astype("datetime64[ns]"), name="time"
+                )
+            return self._indexes[gcm]
+
+    def series(self, community, gcm, variable):
+        path = os.path.join(self.root, columnar_path(community, gcm, variable))
+        return pd.DataFrame({"temp": np.load(path)}, index=self.day_index(gcm))
+
+
+class CubeBackend:
+    """
+    Memory-maps the (community, model, variable, day) cube written by
+    apps.preprocess. Series are zero-copy, read-only views into the shared
+    page cache, so they are not worth holding in the LRU cache. Rows whose
+    file could not be loaded when the cube was built raise FileNotFoundError,
+    as a missing file does for the other backends.
+    """
+
+    cacheable = False
+    version = 2
+
+    def __init__(self, root):
+        with open(os.path.join(root, "cube.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != self.version:
+            raise ValueError(
+                "%s was written by an older apps.preprocess; rebuild it" % root
+            )
+        self.cube = np.load(os.path.join(root, "cube.npy"), mmap_mode="r")
+        self.rows = {stem: i for i, stem in enumerate(self.meta["communities"])}
+        self.days = pd.date_range(
+            self.meta["start"], periods=self.cube.shape[-1], freq="D", name="time"
+        )
+
+    def series(self, community, gcm, variable):
+        stem = community_stem(community)
+        if stem not in self.rows or gcm not in self.meta["spans"]:
+            raise FileNotFoundError(data_path(community, gcm, variable))
+        row = self.rows[stem]
+        m = self.meta["models"].index(gcm)
+        v = self.meta["variables"].index(variable)
+        if not self.meta["covered"][row][m][v]:
+            raise FileNotFoundError(data_path(community, gcm, variable))
+        lo, hi = self.meta["spans"][gcm]
+        values = self.cube[row, m, v, lo:hi]
+        return pd.DataFrame({"temp": values}, index=self.days[lo:hi], copy=False)
+
+
+def make_backend(name, path=None):
+    if name == "s3":
+        return S3Backend(path or data_prefix)
+    if name == "local":
+        if not path:
+            raise ValueError("DATA_STORE=local requires DATA_STORE_PATH")
+        return LocalBackend(path)
+    if name == "memory":
+        return MemoryBackend()
+    if name == "columnar":
+        if not path:
+            raise ValueError("DATA_STORE=columnar requires DATA_STORE_PATH")
+        return ColumnarBackend(path)
+    if name == "cube":
+        if not path:
+            raise ValueError("DATA_STORE=cube requires DATA_STORE_PATH")
+        return CubeBackend(path)
+    raise ValueError("Unknown DATA_STORE backend: " + name)
+
+
+backend = make_backend(
+    os.environ.get("DATA_STORE", "s3"), os.environ.get("DATA_STORE_PATH")
+)
+
+cache = LRUCache(
+    max_bytes=int(float(os.environ.get("DATA_CACHE_MB", 256)) * 1024 * 1024),
+    ttl=float(os.environ.get("DATA_CACHE_TTL", 0)) or None,
+)
+
+# Threads asking for a series that is already being loaded wait for that load.
+flights = SingleFlight()
+
+_loads_lock = threading.Lock()
+_loads = 0
+
+
+def set_backend(new_backend):
+    global backend
+    backend = new_backend
+    cache.clear()
+
+
+def _load(community, gcm, variable):
+    global _loads
+    with _loads_lock:
+        _loads += 1
+    with metrics.timed("load"):
+        return backend.series(community, gcm, variable)
+
+
+def load_stats():
+    """Series read from the backend, and the flights that coalesced them."""
+    with _loads_lock:
+        loads = _loads
+    return dict(flights.stats(), loads=loads)
+
+
+def load_series(community, gcm, variable):
+    """
+    Daily temperatures in °F for one community/model/variable, as a DataFrame
+    with a "temp" column indexed by "time". The frame is shared between
+    callers through the cache and must not be modified in place.
+    """
+    if not getattr(backend, "cacheable", True):
+        return _load(community, gcm, variable)
+    key = (community_stem(community), gcm, variable)
+
+    def load():
+        # A caller that missed the cache just before an earlier flight stored
+        # the series can start its flight after that one has ended; look
+        # again so it doesn't load the series a second time.
+        value = cache.peek(key)
+        if value is not None:
+            return value
+        value = _load(community, gcm, variable)
+        cache.set(key, value)
+        return value
+
+    value = cache.get(key)
+    if value is None:
+        value = flights.do(key, load)
+    return value
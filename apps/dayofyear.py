@@ -0,0 +1,58 @@
+"""
+Per-calendar-day aggregation on integer day-of-year bins.
+
+Every date maps to one of 366 bins laid out as in a leap year, matching the
+"MM-DD" categories the charts use: "02-29" is bin 59 and only leap years
+fill it, so 03-01 is bin 60 in every year. Aggregates for several periods
+(decades, 30-year normals, ...) are computed in one sorted reduction rather
+than a string groupby per period.
+"""
+import numpy as np
+import pandas as pd
+
+# "MM-DD" for every bin, in chart order.
+day_categories = list(pd.date_range("2000-01-01", "2000-12-31").strftime("%m-%d"))
+
+FEB_29 = 59
+
+
+def calendar_bins(index):
+    """Bin (0-365) of each date in a DatetimeIndex."""
+    doy = index.dayofyear.values - 1
+    return doy + ((~index.is_leap_year) & (doy >= FEB_29))
+
+
+def by_period(df, starts, length, how="mean"):
+    """
+    Aggregate the "temp" column of a time-indexed frame by calendar day
+    within each period [start, start + length) of years. The starts must be
+    ascending and at least length apart, as each year counts toward at most
+    one period.
+
+    Returns a (len(starts), 366) float array of the per-day min, mean or max,
+    NaN for days with no data in a period.
+    """
+    starts = np.asarray(starts)
+    years = df.index.year.values
+    period = np.searchsorted(starts, years, side="right") - 1
+    temps = df["temp"].values.astype(np.float64)
+    valid = (period >= 0) & (years < starts[np.maximum(period, 0)] + length)
+    valid &= ~np.isnan(temps)
+    key = period[valid] * 366 + calendar_bins(df.index)[valid]
+    values = temps[valid]
+    size = len(starts) * 366
+
+    out = np.full(size, np.nan)
+    if how == "mean":
+        counts = np.bincount(key, minlength=size)
+        sums = np.bincount(key, weights=values, minlength=size)
+        filled = counts > 0
+        out[filled] = sums[filled] / counts[filled]
+    else:
+        reduce = {"min": np.minimum, "max": np.maximum}[how]
+        order = np.argsort(key, kind="stable")
+        key = key[order]
+        first = np.flatnonzero(np.diff(key, prepend=-1))
+        if len(first):
+            out[key[first]] = reduce.reduceat(values[order], first)
+    return out.reshape(len(starts), 366)
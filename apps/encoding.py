@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Compact encoding of the day-of-year chart figures.
+
+    python -m apps.encoding [COMMUNITY ...]
+
+With FIGURE_ENCODING=compact, numeric trace arrays are sent as plotly.js
+typed arrays (base64 of float32 values) rounded to the precision the charts
+display, and "MM-DD" x values become day positions (0-365) on a linear axis
+labelled from dayofyear.day_categories, so the 366 day names are no longer
+repeated in every trace. The default, "json", leaves figures as they are.
+
+Run as a script, it prints the size of each chart's payload in both
+encodings, before and after gzip.
+"""
+import argparse
+import base64
+import gzip
+import json
+import os
+
+import numpy as np
+from plotly.utils import PlotlyJSONEncoder
+
+from apps.dayofyear import day_categories
+
+mode = os.environ.get("FIGURE_ENCODING", "json")
+
+# Matches the charts' yaxis hoverformat (".2f").
+precision = 2
+
+positions = {day: i for i, day in enumerate(day_categories)}
+
+# Ticks on the first of each month, where the category axis labelled days.
+month_starts = [i for i, day in enumerate(day_categories) if day.endswith("-01")]
+
+
+def typed_array(values, dtype="f4"):
+    values = np.ascontiguousarray(values, dtype=dtype)
+    return {"dtype": dtype, "bdata": base64.b64encode(values).decode("ascii")}
+
+
+def compact_trace(trace):
+    """
+    Copy of trace with "MM-DD" x values as int16 day positions and numeric
+    y values as rounded float32 typed arrays. Numeric hover text is rounded
+    but stays a list, as plotly.js only decodes typed arrays for data arrays,
+    and is dropped when the hover label does not show it.
+    """
+    trace = dict(trace)
+    x = trace.get("x")
+    if x is not None and len(x) and isinstance(x[0], str) and x[0] in positions:
+        trace["x"] = typed_array([positions[day] for day in x], "i2")
+    y = np.asarray(trace.get("y", []))
+    if y.size and y.dtype.kind == "f":
+        trace["y"] = typed_array(np.round(y, precision))
+    text = np.asarray(trace.get("text", ""))
+    if text.ndim and text.dtype.kind == "f":
+        hoverinfo = trace.get("hoverinfo", "all")
+        if "text" in hoverinfo or "all" in hoverinfo:
+            trace["text"] = np.round(text, precision).tolist()
+        else:
+            del trace["text"]
+    return trace
+
+
+def compact_xaxis(xaxis):
+    xaxis = {key: value for key, value in xaxis.items() if key != "categoryarray"}
+    xaxis.update(
+        type="linear",
+        range=[-0.5, len(day_categories) - 0.5],
+        tickmode="array",
+        tickvals=month_starts,
+        ticktext=[day_categories[i] for i in month_starts],
+    )
+    return xaxis
+
+
+def compact_figure(figure):
+    figure = dict(figure)
+    figure["data"] = [compact_trace(trace) for trace in figure["data"]]
+    figure["layout"] = dict(figure["layout"])
+    figure["layout"]["xaxis"] = compact_xaxis(figure["layout"].get("xaxis", {}))
+    return figure
+
+
+def encode_traces(traces):
+    if mode == "compact":
+        return [compact_trace(trace) for trace in traces]
+    return traces
+
+
+def encode_figure(figure):
+    if mode == "compact":
+        return compact_figure(figure)
+    return figure
+
+
+def payload_sizes(figure):
+    payload = json.dumps(figure, cls=PlotlyJSONEncoder).encode("utf-8")
+    return len(payload), len(gzip.compress(payload))
+
+
+def benchmark(names, report=print):
+    """
+    Print the bytes sent for each day-of-year chart of names as JSON and in
+    compact form, raw and gzipped.
+    """
+    global mode
+    from apps import annual_min, cumulative_gdd, gdd
+
+    charts = []
+    for community in names:
+        for gcm in ["GFDL", "NCAR"]:
+            charts.append(("annual_min", annual_min.build_chart, (community, gcm)))
+            for threshold in gdd.thresholds:
+                charts.append(
+                    (
+                        "cumulative_gdd",
+                        cumulative_gdd.build_chart,
+                        (community, threshold, gcm),
+                    )
+                )
+
+    saved, mode = mode, "json"
+    try:
+        totals = np.zeros(4, dtype=np.int64)
+        report(
+            "%-15s %-30s %10s %10s %10s %10s"
+            % ("chart", "inputs", "json", "json.gz", "compact", "compact.gz")
+        )
+        for tab, chart, args in charts:
+            figure = chart.uncached(*args)
+            sizes = payload_sizes(figure) + payload_sizes(compact_figure(figure))
+            totals += sizes
+            report("%-15s %-30s %10d %10d %10d %10d" % ((tab, args) + sizes))
+    finally:
+        mode = saved
+    report(
+        "total %d charts: json %d (gzip %d), compact %d (gzip %d), %.1fx smaller"
+        % ((len(charts),) + tuple(totals) + (totals[0] / max(totals[2], 1),))
+    )
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("communities", nargs="*", default=["Fairbanks"])
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DASH_REQUESTS_PATHNAME_PREFIX", "/")
+    benchmark(args.communities)
+
+
+if __name__ == "__main__":
+    main()
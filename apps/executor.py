@@ -0,0 +1,48 @@
+"""
+Shared, bounded thread pool for running a callback's independent pieces of
+work (e.g. the ERA and GCM traces of a chart) concurrently.
+
+The pool size is set by CHART_WORKERS (default 4); 0 runs tasks one after
+another in the calling thread. The wall-clock time of every task is
+recorded per label in apps.metrics (usda_dash_task_seconds on /metrics).
+"""
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from apps import metrics, profiler
+
+workers = int(os.environ.get("CHART_WORKERS", 4))
+
+pool = (
+    ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart")
+    if workers
+    else None
+)
+
+
+def _timed(label, func, args):
+    start = time.perf_counter()
+    try:
+        with profiler.follow():
+            return func(*args)
+    finally:
+        metrics.observe_task(label, time.perf_counter() - start)
+
+
+def run_all(tasks):
+    """
+    Run (label, func, args) tasks and return their results in order. The
+    first task runs in the calling thread while the rest go to the pool, so
+    a callback never waits on a pool slot for all of its work.
+    """
+    if pool is None or len(tasks) < 2:
+        return [_timed(*task) for task in tasks]
+    # Each task runs in a copy of the caller's context, so it is traced
+    # under the caller's tab.
+    futures = [
+        pool.submit(contextvars.copy_context().run, _timed, *task) for task in tasks[1:]
+    ]
+    first = _timed(*tasks[0])
+    return [first] + [future.result() for future in futures]
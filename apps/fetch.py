@@ -0,0 +1,181 @@
+"""
+Shared HTTP client for fetching community data from S3.
+
+One keep-alive connection pool per process, gzip transfer encoding,
+retries with exponential backoff on connection errors and 429/5xx
+responses, timeouts, and a cap on concurrent requests. Tuned with:
+
+    HTTP_TIMEOUT          seconds to connect and between bytes read (10)
+    HTTP_RETRIES          retries per request (3)
+    HTTP_BACKOFF          backoff factor; waits 0, 2x, 4x, ... seconds (0.5)
+    HTTP_POOL_SIZE        keep-alive connections kept per host (16)
+    HTTP_MAX_CONCURRENCY  requests in flight at once per process (8)
+
+When HTTP_CACHE_DIR is set, responses are also kept on disk with their
+ETag/Last-Modified validators and shared by all worker processes. A cached
+file is served as is for HTTP_CACHE_MAX_AGE seconds (default 86400) after it
+was last checked, then revalidated with a conditional GET; if the origin
+cannot be reached the stale copy is served.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from apps import metrics
+
+timeout = float(os.environ.get("HTTP_TIMEOUT", 10))
+retries = int(os.environ.get("HTTP_RETRIES", 3))
+backoff = float(os.environ.get("HTTP_BACKOFF", 0.5))
+pool_size = int(os.environ.get("HTTP_POOL_SIZE", 16))
+max_concurrency = int(os.environ.get("HTTP_MAX_CONCURRENCY", 8))
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+_slots = threading.BoundedSemaphore(max_concurrency)
+
+log = logging.getLogger(__name__)
+
+
+def make_session():
+    # Imported here so workers reading a local store never load requests.
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+def session():
+    # Connections must not be shared across a fork, so each worker process
+    # builds its own pool on first use.
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = make_session()
+            _session_pid = os.getpid()
+        return _session
+
+
+def get(url, headers=None):
+    """
+    GET url and return the response, raising requests.HTTPError (an OSError)
+    for error statuses once retries are exhausted.
+    """
+    with _slots, metrics.timed("download"):
+        response = session().get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+class HTTPCache:
+    """
+    One file per URL holding a JSON line of validators followed by the body,
+    replaced atomically so concurrent processes only ever read whole entries.
+    The file's mtime records when the entry was last confirmed fresh.
+    """
+
+    def __init__(self, root, max_age):
+        self.root = root
+        self.max_age = max_age
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+        self.stale = 0
+
+    def _path(self, url):
+        return os.path.join(self.root, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                return meta, f.read(), os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return None, None, None
+
+    def _write(self, path, meta, body):
+        tmp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(meta).encode("utf-8") + b"\n")
+            f.write(body)
+        os.replace(tmp, path)
+
+    def get_bytes(self, url):
+        path = self._path(url)
+        meta, body, checked = self._read(path)
+        if body is not None and time.time() - checked < self.max_age:
+            with self._lock:
+                self.hits += 1
+            return body
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            response = get(url, headers=headers)
+        except OSError:
+            if body is None:
+                raise
+            log.warning("serving stale copy of %s", url, exc_info=True)
+            with self._lock:
+                self.stale += 1
+            return body
+
+        if response.status_code == 304 and body is not None:
+            os.utime(path)
+            with self._lock:
+                self.revalidated += 1
+            return body
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        self._write(path, meta, response.content)
+        with self._lock:
+            self.downloads += 1
+        return response.content
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "downloads": self.downloads,
+                "stale": self.stale,
+            }
+
+
+cache = None
+if os.environ.get("HTTP_CACHE_DIR"):
+    cache = HTTPCache(
+        os.environ["HTTP_CACHE_DIR"],
+        float(os.environ.get("HTTP_CACHE_MAX_AGE", 86400)),
+    )
+
+
+def get_bytes(url):
+    if cache is not None:
+        return cache.get_bytes(url)
+    return get(url).content
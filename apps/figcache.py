@@ -0,0 +1,158 @@
+"""
+Memoization of finished chart figures, keyed by callback inputs.
+
+The temp_chart callbacks are pure functions of their inputs, so the
+JSON-serialized figure is kept in an in-process LRU cache of
+FIGURE_CACHE_MB (default 64, 0 disables it) and, when FIGURE_CACHE_DIR is
+set, in a directory shared by all worker processes, capped at
+FIGURE_CACHE_DISK_MB (default 512). Bump FIGURE_CACHE_VERSION when the data
+or the figure code changes so stale entries on disk are not served.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+
+from plotly.utils import PlotlyJSONEncoder
+
+from apps import encoding, metrics
+from apps.cache import LRUCache
+
+version = os.environ.get("FIGURE_CACHE_VERSION", "1")
+
+
+class DiskCache:
+    """
+    One file per entry, written atomically so concurrent workers never see a
+    partial figure. Reads refresh the file's mtime, and once the directory
+    grows past max_bytes the least recently used files are removed.
+    """
+
+    prune_every = 50
+
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(value)
+        os.replace(tmp, path)
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        if self.max_bytes is None:
+            return
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+memory = LRUCache(
+    max_bytes=int(float(os.environ.get("FIGURE_CACHE_MB", 64)) * 1024 * 1024),
+    sizer=len,
+)
+
+disk = None
+if os.environ.get("FIGURE_CACHE_DIR"):
+    disk = DiskCache(
+        os.environ["FIGURE_CACHE_DIR"],
+        int(float(os.environ.get("FIGURE_CACHE_DISK_MB", 512)) * 1024 * 1024),
+    )
+
+
+def get(key):
+    payload = memory.get(key)
+    if payload is None and disk is not None:
+        payload = disk.get(key)
+        if payload is not None:
+            memory.set(key, payload)
+    return payload
+
+
+def put(key, payload):
+    memory.set(key, payload)
+    if disk is not None:
+        disk.set(key, payload)
+
+
+def memoize(name):
+    """
+    Cache a callback's figure under (version, encoding mode, name, *inputs).
+    The undecorated function stays available as .uncached. Calls are traced
+    under the tab named by the first part of name, e.g. "logs".
+    """
+    tab = name.split(".")[0]
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = (version, encoding.mode, name) + args
+            with metrics.tab(tab), metrics.timed("figure"):
+                payload = get(key)
+                if payload is None:
+                    figure = func(*args)
+                    with metrics.timed("serialize"):
+                        payload = json.dumps(figure, cls=PlotlyJSONEncoder)
+                    put(key, payload)
+                return json.loads(payload)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def stats():
+    result = {"memory": memory.stats()}
+    if disk is not None:
+        result["disk"] = disk.stats()
+    return result
@@ -0,0 +1,177 @@
+"""
+Cumulative growing degree day curves for the Growing Degree Days tab.
+
+Each curve is the running sum, over the calendar days of one decade whose
+mean temperature is above the threshold, of the degrees above it. Curves for
+the thresholds offered in the tab can be precomputed for every community with
+`python -m apps.precompute gdd` and served from the resulting table
+(GDD_TABLE).
+"""
+import functools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from apps import dayofyear, datastore
+
+# Thresholds offered by cumulative_gdd.threshold_layout.
+thresholds = [28, 32, 40, 50]
+
+# Decades are charted from minyear up to maxyear (exclusive), per dataset.
+year_ranges = {"ERA": (1980, 2010), "GFDL": (2010, 2101), "NCAR": (2010, 2101)}
+
+days = np.array(dayofyear.day_categories, dtype=object)
+
+
+def decades(gcm):
+    minyear, maxyear = year_ranges[gcm]
+    return list(range(minyear, maxyear - 9, 10))
+
+
+def decade_means(df, gcm):
+    """
+    (decades x 366) mean temperature for each calendar day of each decade
+    charted for this dataset.
+    """
+    return dayofyear.by_period(df, decades(gcm), 10, "mean")
+
+
+def cumulative(means, threshold):
+    """
+    Cumulative degrees above threshold over the days whose mean exceeds it,
+    as (day positions, values). The last point is always "12-31" (day 365),
+    holding the season total.
+    """
+    above = means > threshold
+    positions = np.flatnonzero(above)
+    values = np.cumsum(means[above] - threshold)
+    total = values.max() if len(values) else np.nan
+    if not above[-1]:
+        positions = np.append(positions, len(means) - 1)
+        values = np.append(values, total)
+    return positions, values
+
+
+def cumulative_curves(df, threshold, gcm):
+    """
+    [(decade, x, y), ...] for each decade charted for this dataset.
+    """
+    curves = []
+    for decade, means in zip(decades(gcm), decade_means(df, gcm)):
+        positions, values = cumulative(means, threshold)
+        curves.append((decade, days[positions], values))
+    return curves
+
+
+class GDDTable:
+    """
+    Precomputed curves read from a directory holding curves.npy, a float32
+    array shaped (community, slot, threshold, day) where slot enumerates the
+    (dataset, decade) pairs listed in meta.json and day follows
+    dayofyear.day_categories; days not on a curve hold NaN. The array is
+    memory-mapped so worker processes share it. meta.json also lists, per
+    community, which datasets were loaded when the table was built.
+    """
+
+    version = 2
+
+    def __init__(self, root):
+        with open(os.path.join(root, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != self.version:
+            raise ValueError(
+                "%s was written by an older apps.precompute; rebuild it" % root
+            )
+        self.curves = np.load(os.path.join(root, "curves.npy"), mmap_mode="r")
+        self.rows = {stem: i for i, stem in enumerate(self.meta["communities"])}
+        self.slots = {}
+        for slot, (gcm, decade) in enumerate(self.meta["slots"]):
+            self.slots.setdefault(gcm, []).append((decade, slot))
+        self.covered = self.meta["covered"]
+
+    def lookup(self, community, gcm, threshold):
+        """
+        The cumulative_curves() result for these inputs, or None if the
+        table does not cover them.
+        """
+        stem = datastore.community_stem(community)
+        if (
+            stem not in self.rows
+            or gcm not in self.slots
+            or threshold not in self.meta["thresholds"]
+        ):
+            return None
+        row = self.rows[stem]
+        if gcm not in self.covered[row]:
+            return None
+        t = self.meta["thresholds"].index(threshold)
+        curves = []
+        for decade, slot in self.slots[gcm]:
+            values = self.curves[row, slot, t]
+            on_curve = ~np.isnan(values)
+            on_curve[-1] = True
+            curves.append((decade, days[on_curve], values[on_curve]))
+        return curves
+
+
+def build_table(root, backend, names, workers=8):
+    """
+    Compute curves for every community in names and write them to root as
+    read by GDDTable. Returns the list of (community, gcm, error) that could
+    not be loaded; the table records those as not covered.
+    """
+    slots = [(gcm, decade) for gcm in datastore.models for decade in decades(gcm)]
+    shape = (len(names), len(slots), len(thresholds), len(days))
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, "curves.npy")
+    tmp = path + ".tmp"
+    curves = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=shape)
+    curves[:] = np.nan
+
+    def compute(curves, job):
+        row, community, gcm = job
+        try:
+            df = backend.series(community, gcm, "mean")
+        except (OSError, ValueError) as e:
+            return community, gcm, e
+        for decade, means in zip(decades(gcm), decade_means(df, gcm)):
+            slot = slots.index((gcm, decade))
+            for t, threshold in enumerate(thresholds):
+                positions, values = cumulative(means, threshold)
+                curves[row, slot, t, positions] = values
+        return None
+
+    jobs = [
+        (row, community, gcm)
+        for row, community in enumerate(names)
+        for gcm in datastore.models
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(functools.partial(compute, curves), jobs))
+    missing = [result for result in results if result]
+
+    curves.flush()
+    del curves
+    os.replace(tmp, path)
+    covered = [[] for _ in names]
+    for (row, _, gcm), result in zip(jobs, results):
+        if result is None:
+            covered[row].append(gcm)
+    meta = {
+        "version": GDDTable.version,
+        "communities": [datastore.community_stem(name) for name in names],
+        "slots": slots,
+        "thresholds": thresholds,
+        "covered": covered,
+    }
+    with open(os.path.join(root, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return missing
+
+
+def load_table(path):
+    if not path:
+        return None
+    return GDDTable(path)
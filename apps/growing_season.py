@@ -0,0 +1,269 @@
+"""
+Vectorized longest-run growing season engine.
+
+Replaces calling logs.get_max_days_alt once per year: temperatures are laid
+out as a (years x 366) matrix and the longest stretch of consecutive days
+above a threshold is found for every year in one pass.
+
+Results for the thresholds offered in the Growing Season tab can also be
+precomputed for every community with `python -m apps.precompute seasons` and
+served from the resulting table (SEASON_TABLE).
+"""
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from apps import datastore
+
+# Thresholds offered by logs.threshold_layout.
+thresholds = [28, 32, 40, 50]
+
+# Years charted per dataset, as in logs.add_time_series.
+year_ranges = {"ERA": (1980, 2010), "GFDL": (2010, 2100), "NCAR": (2010, 2100)}
+
+
+def year_matrix(df, minyear, maxyear):
+    """
+    Lay out a time-indexed frame's "temp" column as a (years x 366) matrix,
+    one row per year from minyear to maxyear (exclusive). Columns are the
+    position of each record within its year, so consecutive records stay
+    adjacent exactly as they are in the frame; unused cells hold NaN.
+
+    Returns the temperature matrix and a matching matrix of dates
+    (datetime64[D], NaT where unused).
+    """
+    years = df.index.year.values
+    mask = (years >= minyear) & (years < maxyear)
+    years = years[mask]
+    temps = df["temp"].values[mask]
+    days = df.index.values[mask].astype("datetime64[D]")
+
+    # Position within the year: record number minus the year's first record.
+    _, first, inverse = np.unique(years, return_index=True, return_inverse=True)
+    position = np.arange(len(years)) - first[inverse]
+    row = years - minyear
+
+    values = np.full((maxyear - minyear, 366), np.nan, dtype=temps.dtype)
+    dates = np.full(
+        (maxyear - minyear, 366), np.datetime64("NaT"), dtype="datetime64[D]"
+    )
+    values[row, position] = temps
+    dates[row, position] = days
+    return values, dates
+
+
+def longest_runs(matrix, threshold):
+    """
+    For each row of a (years x days) matrix, find the longest run of
+    consecutive values strictly above threshold. NaN counts as not above.
+
+    Returns (ndays, start, end) arrays of column positions, end inclusive.
+    Rows with no value above threshold get ndays 0 and start/end -1.
+    """
+    above = matrix > threshold
+    columns = np.arange(matrix.shape[1])
+    # Column of the most recent value not above threshold, at or before each column.
+    last_cold = np.maximum.accumulate(np.where(above, -1, columns), axis=1)
+    run_length = np.where(above, columns - last_cold, 0)
+    ndays = run_length.max(axis=1)
+    end = run_length.argmax(axis=1)
+    start = end - ndays + 1
+
+    # Each run reaches its full length exactly once, so more than one cell at
+    # the maximum means several runs tie for longest.
+    tied = np.flatnonzero((run_length == ndays[:, None]).sum(axis=1) > 1)
+    for row in tied[ndays[tied] > 0]:
+        start[row], end[row] = _value_counts_run(above[row])
+
+    empty = ndays == 0
+    start[empty] = -1
+    end[empty] = -1
+    return ndays, start, end
+
+
+def _value_counts_run(above):
+    # get_max_days_alt picks among equally long runs by the order of
+    # Series.value_counts(), which is not simply the earliest run; defer to
+    # the same call so tied years give identical results.
+    ids = np.cumsum(~above)[above]
+    chosen = pd.Series(ids).value_counts().index[0]
+    positions = np.flatnonzero(above)[ids == chosen]
+    return positions[0], positions[-1]
+
+
+def season_days(values, dates, threshold):
+    """
+    Longest season above threshold for each row of a year_matrix, as
+    (ndays, startday, endday) arrays with days encoded as month * 100 + day.
+    endday is the first day after the run, or 12-31 when the run lasts to
+    the end of the year. Years without a season get ndays 0 and days -1.
+    """
+    ndays, start, end = longest_runs(values, threshold)
+    found = ndays > 0
+    first_day = dates[np.arange(len(ndays)), np.maximum(start, 0)]
+    first_day = np.where(found, first_day, np.datetime64("2000-01-01"))
+    after_day = first_day + ndays.astype("timedelta64[D]")
+    first_day = pd.DatetimeIndex(first_day)
+    after_day = pd.DatetimeIndex(after_day)
+    startday = np.asarray(first_day.month * 100 + first_day.day)
+    endday = np.asarray(after_day.month * 100 + after_day.day)
+    endday[endday == 101] = 1231
+    startday[~found] = -1
+    endday[~found] = -1
+    return ndays, startday, endday
+
+
+def format_day(day):
+    return "%02d-%02d" % divmod(int(day), 100)
+
+
+def seasons_dict(minyear, ndays, startday, endday):
+    years = {}
+    for i, n in enumerate(ndays):
+        if n <= 0:
+            years[minyear + i] = {"ndays": 0, "startdate": None, "enddate": None}
+            continue
+        years[minyear + i] = {
+            "ndays": int(n),
+            "startdate": format_day(startday[i]),
+            "enddate": format_day(endday[i]),
+        }
+    return years
+
+
+def growing_seasons(df, threshold, minyear, maxyear):
+    """
+    Longest season above threshold for each year, in the same
+    {"ndays", "startdate", "enddate"} form as logs.get_max_days_alt:
+    dates are "%m-%d" strings, enddate being the first day after the run
+    ("12-31" when the run lasts to the end of the year).
+    """
+    values, dates = year_matrix(df, minyear, maxyear)
+    return seasons_dict(minyear, *season_days(values, dates, threshold))
+
+
+class SeasonTable:
+    """
+    Precomputed seasons for every community, dataset, threshold and year.
+    ndays, startday and endday are int16 arrays shaped
+    (community, model, threshold, year) with days encoded as in season_days;
+    covered is a (community, model) bool array, False where the community's
+    file could not be loaded when the table was built.
+    """
+
+    version = 2
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.meta = json.loads(str(data["meta"]))
+            if self.meta.get("version") != self.version:
+                raise ValueError(
+                    "%s was written by an older apps.precompute; rebuild it" % path
+                )
+            self.ndays = data["ndays"]
+            self.startday = data["startday"]
+            self.endday = data["endday"]
+            self.covered = data["covered"]
+        self.rows = {stem: i for i, stem in enumerate(self.meta["communities"])}
+
+    def lookup(self, community, gcm, threshold, minyear, maxyear):
+        """
+        The growing_seasons() result for these inputs, or None if the table
+        does not cover them.
+        """
+        stem = datastore.community_stem(community)
+        first = self.meta["first_year"]
+        if (
+            stem not in self.rows
+            or gcm not in self.meta["models"]
+            or threshold not in self.meta["thresholds"]
+            or minyear < first
+            or maxyear > first + self.ndays.shape[-1]
+        ):
+            return None
+        row = self.rows[stem]
+        model = self.meta["models"].index(gcm)
+        if not self.covered[row, model]:
+            return None
+        key = (
+            row,
+            model,
+            self.meta["thresholds"].index(threshold),
+            slice(minyear - first, maxyear - first),
+        )
+        return seasons_dict(
+            minyear, self.ndays[key], self.startday[key], self.endday[key]
+        )
+
+
+def build_table(path, backend, names, workers=8):
+    """
+    Compute seasons for every community in names and write them to path as
+    an .npz file readable by SeasonTable. Returns the list of
+    (community, gcm, error) that could not be loaded; the table marks those
+    rows as not covered.
+    """
+    first = min(lo for lo, hi in year_ranges.values())
+    nyears = max(hi for lo, hi in year_ranges.values()) - first
+    shape = (len(names), len(datastore.models), len(thresholds), nyears)
+    ndays = np.zeros(shape, dtype=np.int16)
+    startday = np.full(shape, -1, dtype=np.int16)
+    endday = np.full(shape, -1, dtype=np.int16)
+    covered = np.zeros(shape[:2], dtype=bool)
+
+    def compute(job):
+        row, community, m, gcm = job
+        minyear, maxyear = year_ranges[gcm]
+        try:
+            df = backend.series(community, gcm, "min")
+        except (OSError, ValueError) as e:
+            return community, gcm, e
+        values, dates = year_matrix(df, minyear, maxyear)
+        years = slice(minyear - first, maxyear - first)
+        for t, threshold in enumerate(thresholds):
+            n, start, end = season_days(values, dates, threshold)
+            ndays[row, m, t, years] = n
+            startday[row, m, t, years] = start
+            endday[row, m, t, years] = end
+        covered[row, m] = True
+        return None
+
+    jobs = [
+        (row, community, m, gcm)
+        for row, community in enumerate(names)
+        for m, gcm in enumerate(datastore.models)
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        missing = [result for result in pool.map(compute, jobs) if result]
+
+    meta = {
+        "version": SeasonTable.version,
+        "communities": [datastore.community_stem(name) for name in names],
+        "models": datastore.models,
+        "thresholds": thresholds,
+        "first_year": first,
+    }
+    buf = io.BytesIO()
+    np.savez(
+        buf,
+        meta=np.array(json.dumps(meta)),
+        ndays=ndays,
+        startday=startday,
+        endday=endday,
+        covered=covered,
+    )
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(buf.getvalue())
+    os.replace(tmp, path)
+    return missing
+
+
+def load_table(path):
+    if not path:
+        return None
+    return SeasonTable(path)
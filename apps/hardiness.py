@@ -4,20 +4,8 @@
 Template for SNAP Dash apps.
 """
 import os
-import json
-import plotly.graph_objs as go
-import xarray as xr
-import dash
 from dash import dcc, html
-import dash_dangerously_set_inner_html as ddsih
-import pandas as pd
-import geopandas as gpd
-import numpy as np
-import urllib, json
-import re
-from dash.dependencies import Input, Output, State
 from apps import common
-from application import app
 
 path_prefix = os.environ["DASH_REQUESTS_PATHNAME_PREFIX"]
 
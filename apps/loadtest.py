@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Load test of the Dash callback endpoint, with no network access needed.
+
+    python -m apps.loadtest [--concurrency 1,4,16] [--duration 30]
+                            [--url URL] [--origin-latency-ms 50] [--json FILE]
+
+Simulated visitors pick communities from CommunityList.json and, one request
+at a time, switch tabs and change the community, threshold and model with
+the weights in `actions`, posting each resulting callback to
+_dash-update-component. Throughput, error rate and p50/p95/p99 latency are
+reported per callback for each concurrency level in turn.
+
+Unless --url points at a running instance, the app is started on a free
+port in a subprocess that reads its data through DATA_STORE=s3 from a local
+stand-in for the bucket. The stand-in generates each community's CSVs from
+a fixed seed (see apps.benchmarks) and can add --origin-latency-ms to every
+response.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+tabs = {
+    "tab-1": ("tcharts", ["community", "threshold", "gcm"]),
+    "tab-2": ("acharts", ["community", "gcm"]),
+    "tab-3": ("ccharts", ["community", "threshold", "gcm"]),
+}
+
+# Relative weights of what a visitor does next.
+actions = {"tab": 2, "community": 3, "threshold": 3, "gcm": 2}
+
+thresholds = [28, 32, 40, 50]
+gcms = ["GFDL", "NCAR"]
+
+
+class StandInBucket(ThreadingHTTPServer):
+    """Serves min/<stem>_<gcm>_min.csv style paths with generated data."""
+
+    daemon_threads = True
+    path_pattern = re.compile(
+        r"^/(min|mean)/([A-Za-z0-9]+)_(ERA|GFDL|NCAR)_(min|mean)\.csv$"
+    )
+
+    def __init__(self, address, latency=0.0):
+        super().__init__(address, BucketHandler)
+        self.latency = latency
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def csv(self, stem, gcm, variable):
+        from apps.benchmarks import fixture_csv
+
+        key = (stem, gcm, variable)
+        with self.lock:
+            body = self.files.get(key)
+        if body is None:
+            seed = zlib.crc32(("%s_%s_%s" % key).encode("utf-8"))
+            body = fixture_csv(gcm, variable, seed).encode("utf-8")
+            with self.lock:
+                self.files[key] = body
+        return body
+
+
+class BucketHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = self.server.path_pattern.match(self.path)
+        if match is None or match.group(1) != match.group(4):
+            self.send_error(404)
+            return
+        body = self.server.csv(match.group(2), match.group(3), match.group(1))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_app(port):
+    """Run the app on a threaded werkzeug server (in the app subprocess)."""
+    import logging
+
+    from werkzeug.serving import make_server
+
+    import index
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    make_server("127.0.0.1", port, index.app.server, threaded=True).serve_forever()
+
+
+def start_app(bucket_url, port):
+    env = dict(os.environ)
+    env.update(
+        DASH_REQUESTS_PATHNAME_PREFIX="/",
+        DATA_STORE="s3",
+        DATA_STORE_PATH=bucket_url,
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from apps.loadtest import serve_app; serve_app(%d)" % port,
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    url = "http://127.0.0.1:%d/" % port
+    import requests
+
+    for _ in range(600):
+        if process.poll() is not None:
+            raise RuntimeError("app exited with status %d" % process.returncode)
+        try:
+            requests.get(url + "_dash-layout", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("app did not start")
+
+
+def callback_body(output, inputs, changed):
+    """
+    The JSON the Dash renderer posts. output and each of changed are
+    "id.property"; changed is empty for an initial call.
+    """
+    output_id, output_property = output.split(".")
+    return {
+        "output": output,
+        "outputs": {"id": output_id, "property": output_property},
+        "inputs": [
+            {"id": name, "property": prop, "value": value}
+            for name, prop, value in inputs
+        ],
+        "changedPropIds": list(changed),
+        "state": [],
+    }
+
+
+class Visitor:
+    """One simulated browser session, yielding the callbacks it triggers."""
+
+    def __init__(self, names, rng):
+        self.names = names
+        self.rng = rng
+        self.state = {
+            "tab": "tab-1",
+            "community": rng.choice(names),
+            "threshold": 32,
+            "gcm": "GFDL",
+        }
+
+    def chart_request(self, changed):
+        output, inputs = tabs[self.state["tab"]]
+        return output, callback_body(
+            output + ".figure",
+            [(name, "value", self.state[name]) for name in inputs],
+            [name + ".value" for name in changed],
+        )
+
+    def first_requests(self, switched=False):
+        """
+        Loading the page, or switching to another tab, renders the tab's page
+        and then draws its chart. The chart's controls are new then, so its
+        callback is an initial call with nothing changed.
+        """
+        page = callback_body(
+            "page-content.children",
+            [("url", "pathname", "/"), ("tabs", "value", self.state["tab"])],
+            ["tabs.value"] if switched else [],
+        )
+        return [("page-content", page), self.chart_request([])]
+
+    def next_requests(self):
+        action = self.rng.choices(list(actions), weights=list(actions.values()))[0]
+        if action == "tab":
+            self.state["tab"] = self.rng.choice(
+                [tab for tab in tabs if tab != self.state["tab"]]
+            )
+            return self.first_requests(switched=True)
+        if action == "threshold" and self.state["tab"] == "tab-2":
+            action = "gcm"
+        choices = {
+            "community": self.names,
+            "threshold": thresholds,
+            "gcm": gcms,
+        }[action]
+        self.state[action] = self.rng.choice(
+            [value for value in choices if value != self.state[action]]
+        )
+        return [self.chart_request([action])]
+
+
+def run_level(url, names, concurrency, duration, seed=0):
+    """{callback: {"latencies": [...], "errors": n}} for one level."""
+    import requests
+
+    results = defaultdict(lambda: {"latencies": [], "errors": 0})
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def visit(number):
+        session = requests.Session()
+        visitor = Visitor(names, random.Random(seed * 1000 + number))
+        pending = visitor.first_requests()
+        while time.perf_counter() < deadline:
+            for callback, body in pending:
+                start = time.perf_counter()
+                try:
+                    response = session.post(
+                        url + "_dash-update-component", json=body, timeout=60
+                    )
+                    ok = response.status_code in (200, 204)
+                except requests.RequestException:
+                    ok = False
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if ok:
+                        results[callback]["latencies"].append(elapsed)
+                    else:
+                        results[callback]["errors"] += 1
+            pending = visitor.next_requests()
+
+    threads = [
+        threading.Thread(target=visit, args=(number,)) for number in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return dict(results), time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    rows = {}
+    for callback, result in sorted(results.items()):
+        latencies = np.array(result["latencies"])
+        total = len(latencies) + result["errors"]
+        p50, p95, p99 = (
+            np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+        )
+        rows[callback] = {
+            "requests": total,
+            "throughput": total / elapsed,
+            "error_rate": result["errors"] / total if total else 0.0,
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+        }
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--url", help="test a running instance instead")
+    parser.add_argument("--origin-latency-ms", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    from apps import communities
+
+    names = communities.names()
+    bucket = app = None
+    url = args.url
+    try:
+        if url is None:
+            bucket = StandInBucket(("127.0.0.1", 0), args.origin_latency_ms / 1000)
+            threading.Thread(target=bucket.serve_forever, daemon=True).start()
+            app, url = start_app(
+                "http://127.0.0.1:%d/" % bucket.server_address[1], free_port()
+            )
+        if not url.endswith("/"):
+            url += "/"
+
+        report = {}
+        for level in [int(value) for value in args.concurrency.split(",")]:
+            results, elapsed = run_level(url, names, level, args.duration, args.seed)
+            rows = report[level] = summarize(results, elapsed)
+            print("concurrency %d, %.1fs" % (level, elapsed))
+            print(
+                "  %-14s %8s %8s %7s %9s %9s %9s"
+                % (
+                    "callback",
+                    "requests",
+                    "req/s",
+                    "errors",
+                    "p50 ms",
+                    "p95 ms",
+                    "p99 ms",
+                )
+            )
+            for callback, row in rows.items():
+                print(
+                    "  %-14s %8d %8.1f %6.1f%% %9.1f %9.1f %9.1f"
+                    % (
+                        callback,
+                        row["requests"],
+                        row["throughput"],
+                        row["error_rate"] * 100,
+                        row["p50"] * 1000,
+                        row["p95"] * 1000,
+                        row["p99"] * 1000,
+                    )
+                )
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if app is not None:
+            app.terminate()
+            app.wait()
+        if bucket is not None:
+            bucket.shutdown()
+
+
+if __name__ == "__main__":
+    main()
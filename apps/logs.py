@@ -3,26 +3,32 @@
 Template for SNAP Dash apps.
 """
 import os
-import json
-import plotly.graph_objs as go
-import dash
 from dash import dcc, html, dash_table
-import dash_dangerously_set_inner_html as ddsih
 import pandas as pd
-import xarray as xr
-import geopandas as gpd
-import numpy as np
-import urllib, json
-import re
-from dash.dependencies import Input, Output, State
-from apps import common
+from dash.dependencies import Input, Output
+from apps import (
+    browsercache,
+    clientside,
+    common,
+    communities,
+    datastore,
+    executor,
+    figcache,
+    growing_season,
+    metrics,
+    patches,
+)
 from application import app
 
 path_prefix = os.environ["DASH_REQUESTS_PATHNAME_PREFIX"]
 
 data_prefix = "https://s3-us-west-2.amazonaws.com/community-logs-data/"
 
-season_table_data = gpd.read_file("season.csv")
+season_table_data = pd.read_csv("season.csv", dtype=str, keep_default_na=False)
+
+# Precomputed seasons (python -m apps.precompute seasons); thresholds it does
+# not cover are computed live.
+season_table = growing_season.load_table(os.environ.get("SEASON_TABLE"))
 
 
 def get_max_days_alt(datayear, community, threshold, gcm):
@@ -47,8 +53,7 @@ def get_max_days_alt(datayear, community, threshold, gcm):
 
 
 path_prefix = os.environ["DASH_REQUESTS_PATHNAME_PREFIX"]
-communities = gpd.read_file("CommunityList.json")
-names = list(communities.LocationName)
+names = communities.names()
 
 community_layout = dcc.Dropdown(
     id="community",
@@ -95,7 +100,9 @@ config = {
 }
 
 graph_layout = html.Div(
-    className="container", children=[dcc.Graph(id="tcharts", config=config)]
+    className="container",
+    children=[dcc.Graph(id="tcharts", config=config)]
+    + (clientside.stores("tbundle") or browsercache.stores("tcharts")),
 )
 
 table_columns = [
@@ -199,32 +206,20 @@ This is because the tool finds the longest consecutive period during which the d
 
 
 def add_time_series(community, threshold, gcm, figure):
-    community_name = re.sub("[^A-Za-z0-9]+", "", community) + "_" + gcm
-    comm_filename = community_name
-    df = pd.read_csv(
-        "https://s3-us-west-2.amazonaws.com/community-logs-data/min/"
-        + comm_filename
-        + "_min.csv"
-    )
-    imperial_conversion_lu = {"temp": 1.8, "precip": 0.0393701}
-    df["temp"] = df["temp"] * imperial_conversion_lu["temp"] + 32
-    df["time"] = pd.to_datetime(df["time"])
-    years = {}
-    # for i in range (1971,2100):
-    minyear = 1980
-    maxyear = 2101
     if gcm == "ERA":
         minyear = 1980
         maxyear = 2010
     else:
         minyear = 2010
         maxyear = 2100
-    for i in range(minyear, maxyear, 1):
-        years[i] = {}
-
-    for key in sorted(years):
-        df_annual = df[df["time"].dt.year == int(key)]
-        years[key] = get_max_days_alt(df_annual, community_name, threshold, gcm)
+    years = None
+    if season_table is not None:
+        with metrics.timed("compute"):
+            years = season_table.lookup(community, gcm, threshold, minyear, maxyear)
+    if years is None:
+        df = datastore.load_series(community, gcm, "min")
+        with metrics.timed("compute"):
+            years = growing_season.growing_seasons(df, threshold, minyear, maxyear)
     for i in range(minyear, maxyear - 9, 10):
         decade_dict = {}
         for j in range(0, 10):
@@ -267,32 +262,59 @@ def add_time_series(community, threshold, gcm, figure):
         )
 
 
-@app.callback(
-    Output("tcharts", "figure"),
-    inputs=[
-        Input("community", "value"),
-        Input("threshold", "value"),
-        Input("gcm", "value"),
-    ],
-)
+# One trace per decade charted from the ERA data, ahead of the GCM traces.
+historical_count = len(range(1980, 2010 - 9, 10))
+
+
+def chart_title(community, threshold, gcm):
+    return (
+        "Growing Season (Start, Length, End)<br>Number of Days > "
+        + str(threshold)
+        + unit_lu["temp"]["imperial"]
+        + "<br>"
+        + community
+        + ", Alaska, Historical and Projected ["
+        + gcm
+        + "] model"
+    )
+
+
+@figcache.memoize("logs.projected")
+def projected_traces(community, threshold, gcm):
+    projected = {"data": []}
+    add_time_series(community, threshold, gcm, projected)
+    return projected["data"]
+
+
+@metrics.traced("logs")
 def temp_chart(community, threshold, gcm):
+    if patches.only_changed("gcm"):
+        return patches.replace_traces(
+            historical_count,
+            projected_traces(community, threshold, gcm),
+            chart_title(community, threshold, gcm),
+        )
+    return build_chart(community, threshold, gcm)
+
+
+@figcache.memoize("logs")
+def build_chart(community, threshold, gcm):
     station = "PAFA"
     acis_data = {}
     # with urllib.request.urlopen('http://data.rcc-acis.org/StnData?sid=' + station + '&sdate=1950-01-01&edate=2019-03-15&elems=4') as url:
     #    acis_data = json.loads(url.read().decode())
     figure = {}
-    figure["data"] = []
-    add_time_series(community, threshold, "ERA", figure)
-    add_time_series(community, threshold, gcm, figure)
+    historical = {"data": []}
+    projected = {"data": []}
+    executor.run_all(
+        [
+            ("logs.ERA", add_time_series, (community, threshold, "ERA", historical)),
+            ("logs." + gcm, add_time_series, (community, threshold, gcm, projected)),
+        ]
+    )
+    figure["data"] = historical["data"] + projected["data"]
     layout = {
-        "title": "Growing Season (Start, Length, End)<br>Number of Days > "
-        + str(threshold)
-        + unit_lu["temp"]["imperial"]
-        + "<br>"
-        + community
-        + ", Alaska, Historical and Projected ["
-        + gcm
-        + "] model",
+        "title": chart_title(community, threshold, gcm),
         "hovermode": "closest",
         "hoverlabel": {"namelength": 20},
         "showlegend": False,
@@ -684,3 +706,26 @@ def temp_chart(community, threshold, gcm):
     tMod = 32
     figure["layout"] = layout
     return figure
+
+
+def chart_bundle(community):
+    return clientside.bundle(
+        build_chart, historical_count, community, growing_season.thresholds
+    )
+
+
+if clientside.enabled:
+    clientside.register(app, "tcharts", "tbundle", chart_bundle)
+elif browsercache.enabled:
+    browsercache.register(
+        app, "tcharts", ["community", "threshold", "gcm"], build_chart
+    )
+else:
+    app.callback(
+        Output("tcharts", "figure"),
+        inputs=[
+            Input("community", "value"),
+            Input("threshold", "value"),
+            Input("gcm", "value"),
+        ],
+    )(temp_chart)
@@ -0,0 +1,162 @@
+"""
+Latency histograms for the stages of drawing a chart, exported in the
+Prometheus text format.
+
+Stages nest: "callback" is a whole chart callback, "figure" one figure
+through the figure cache, "load" reading one series on a data cache miss,
+"parse" reading and converting one CSV file, "download" one HTTP GET,
+"compute" the season, GDD or minimum calculations and "serialize" encoding
+a figure for the figure cache. Observations are
+filed under the tab whose chart is being drawn, carried in a context
+variable (executor tasks inherit it), or "none" outside of one. Each task
+run by apps.executor (the traces for one dataset, e.g. "logs.ERA") is also
+timed under its label.
+
+With METRICS=1, GET /metrics returns the histograms along with the data,
+figure and HTTP cache statistics.
+"""
+import bisect
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+
+enabled = os.environ.get("METRICS", "").lower() in ("1", "true", "yes")
+
+buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Cache statistics that can go down; the rest only ever increase.
+gauges = ("entries", "bytes", "max_bytes", "in_flight")
+
+current_tab = contextvars.ContextVar("tab", default="none")
+
+_lock = threading.Lock()
+_histograms = {}
+_tasks = {}
+
+
+def _add(histograms, key, seconds):
+    slot = bisect.bisect_left(buckets, seconds)
+    with _lock:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = {
+                "counts": [0] * (len(buckets) + 1),
+                "sum": 0.0,
+            }
+        histogram["counts"][slot] += 1
+        histogram["sum"] += seconds
+
+
+def observe(stage, seconds, tab=None):
+    _add(_histograms, (tab or current_tab.get(), stage), seconds)
+
+
+def observe_task(label, seconds):
+    _add(_tasks, label, seconds)
+
+
+@contextlib.contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def tab(name):
+    token = current_tab.set(name)
+    try:
+        yield
+    finally:
+        current_tab.reset(token)
+
+
+def traced(name, stage="callback"):
+    """Time every call of the decorated function as stage of tab name."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            with tab(name), timed(stage):
+                return func(*args)
+
+        return wrapper
+
+    return decorator
+
+
+def _copy(histograms):
+    with _lock:
+        return {
+            key: {"counts": list(value["counts"]), "sum": value["sum"]}
+            for key, value in histograms.items()
+        }
+
+
+def histograms():
+    return _copy(_histograms)
+
+
+def task_histograms():
+    return _copy(_tasks)
+
+
+def _render_histogram(lines, metric, labels, histogram):
+    total = 0
+    for bound, count in zip(buckets + ("+Inf",), histogram["counts"]):
+        total += count
+        lines.append('%s_bucket{%s,le="%s"} %d' % (metric, labels, bound, total))
+    lines.append("%s_sum{%s} %r" % (metric, labels, histogram["sum"]))
+    lines.append("%s_count{%s} %d" % (metric, labels, total))
+
+
+def cache_stats():
+    from apps import datastore, fetch, figcache
+
+    yield "data_cache", datastore.cache.stats()
+    yield "data_loads", datastore.load_stats()
+    for name, stats in figcache.stats().items():
+        yield "figure_cache_" + name, stats
+    if fetch.cache is not None:
+        yield "http_cache", fetch.cache.stats()
+
+
+def render():
+    lines = [
+        "# HELP usda_dash_stage_seconds Time spent in each stage of drawing a chart.",
+        "# TYPE usda_dash_stage_seconds histogram",
+    ]
+    for (tab_name, stage), histogram in sorted(histograms().items()):
+        labels = 'tab="%s",stage="%s"' % (tab_name, stage)
+        _render_histogram(lines, "usda_dash_stage_seconds", labels, histogram)
+    lines.append(
+        "# HELP usda_dash_task_seconds Time spent in each chart executor task."
+    )
+    lines.append("# TYPE usda_dash_task_seconds histogram")
+    for label, histogram in sorted(task_histograms().items()):
+        labels = 'task="%s"' % label
+        _render_histogram(lines, "usda_dash_task_seconds", labels, histogram)
+    for name, stats in cache_stats():
+        for key, value in sorted(stats.items()):
+            if value is None:
+                continue
+            metric = "usda_dash_%s_%s" % (name, key)
+            if key in gauges:
+                lines.append("# TYPE %s gauge" % metric)
+            else:
+                metric += "_total"
+                lines.append("# TYPE %s counter" % metric)
+            lines.append("%s %s" % (metric, value))
+    return "\n".join(lines) + "\n"
+
+
+def register(server, path="/metrics"):
+    def metrics_route():
+        return render(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+    server.add_url_rule(path, "metrics", metrics_route)
@@ -0,0 +1,35 @@
+"""
+Partial figure updates for the chart callbacks.
+
+When a callback is triggered only by the gcm radio, the historical (ERA)
+traces already on the client are still correct, so the callback sends a
+dash.Patch replacing just the projected traces and the title instead of
+the whole figure.
+"""
+from dash import Patch, ctx
+from dash.exceptions import MissingCallbackContextException
+
+
+def only_changed(component_id):
+    """
+    True when the running callback was triggered by component_id alone.
+    Initial renders (nothing triggered) and calls made outside a callback,
+    e.g. by apps.warmup, are never partial.
+    """
+    try:
+        triggered = ctx.triggered_prop_ids
+    except MissingCallbackContextException:
+        return False
+    return list(triggered.values()) == [component_id]
+
+
+def replace_traces(start, traces, title):
+    """
+    Patch overwriting figure["data"][start:] with traces, which must be as
+    many as the traces being replaced, and setting the layout title.
+    """
+    patched = Patch()
+    for i, trace in enumerate(traces):
+        patched["data"][start + i] = trace
+    patched["layout"]["title"] = title
+    return patched
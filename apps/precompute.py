@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Precompute chart results for every community so callbacks can serve them
+from a table instead of computing them per request.
+
+    python -m apps.precompute seasons OUTPUT.npz [--source local --source-path DIR]
+    python -m apps.precompute gdd OUTPUT_DIR [--source local --source-path DIR]
+
+seasons: growing season length, start and end for every community, dataset,
+year and threshold offered in the Growing Season tab. Serve it by pointing
+SEASON_TABLE at the output file.
+
+gdd: cumulative growing degree day curves for every community, dataset,
+decade and threshold offered in the Growing Degree Days tab. Serve it by
+pointing GDD_TABLE at the output directory.
+"""
+import argparse
+import os
+import sys
+import time
+
+from apps import datastore, gdd, growing_season
+from apps.preprocess import community_names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("table", choices=["seasons", "gdd"])
+    parser.add_argument("output", help="file (seasons) or directory (gdd) to write")
+    parser.add_argument(
+        "--source",
+        default=os.environ.get("DATA_STORE", "s3"),
+        choices=["s3", "local", "columnar", "cube"],
+        help="where to read community data from (default: DATA_STORE or s3)",
+    )
+    parser.add_argument(
+        "--source-path",
+        default=os.environ.get("DATA_STORE_PATH"),
+        help="bucket prefix URL for s3, or directory for the other stores",
+    )
+    parser.add_argument("--communities", default="CommunityList.json")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    backend = datastore.make_backend(args.source, args.source_path)
+    names = community_names(args.communities)
+    start = time.perf_counter()
+    builders = {"seasons": growing_season.build_table, "gdd": gdd.build_table}
+    missing = builders[args.table](args.output, backend, names, args.workers)
+    for community, gcm, error in missing:
+        print("missing", community, gcm, error, file=sys.stderr)
+    print(
+        "wrote %s table for %d communities (%d files missing) to %s in %.1fs"
+        % (
+            args.table,
+            len(names),
+            len(missing),
+            args.output,
+            time.perf_counter() - start,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
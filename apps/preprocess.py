@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Convert the community CSV archive into the binary stores read by
+DATA_STORE=columnar and DATA_STORE=cube.
+
+    python -m apps.preprocess OUTPUT_DIR [--format cube] [--source local --source-path DIR]
+
+Every min/*_min.csv and mean/*_mean.csv file for the communities in
+CommunityList.json is parsed once and converted to float32 °F values. The
+columnar format writes one array per file, with all files for a model sharing
+one day index under index/<model>.npy. The cube format writes everything into
+a single cube.npy indexed by (community, model, variable, day), described by
+cube.json, which every worker process can memory-map.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from apps import communities, datastore
+
+
+def community_names(path=communities.default_path):
+    return communities.names(path)
+
+
+def save_array(path, array):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def load(backend, community, gcm, variable):
+    df = backend.series(community, gcm, variable)
+    days = df.index.values.astype("datetime64[D]")
+    return days, df["temp"].to_numpy(dtype=np.float32)
+
+
+def fetch_all(backend, names, workers):
+    """
+    Yield ((community, gcm, variable), (days, temps) or exception) for every
+    community file, loading them on a thread pool.
+    """
+    jobs = [
+        (community, gcm, variable)
+        for variable in datastore.variables
+        for gcm in datastore.models
+        for community in names
+    ]
+
+    def fetch(job):
+        try:
+            return job, load(backend, *job)
+        except (requests.RequestException, OSError, ValueError) as e:
+            # fetch.get_bytes raises requests.HTTPError for a missing file on S3
+            # (a 404) and other RequestExceptions once retries run out; local
+            # backends raise OSError.
+            return job, e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(fetch, jobs)
+
+
+def build_columnar(output, backend, names, workers=8):
+    indexes = {}
+    missing = []
+    written = 0
+    for (community, gcm, variable), result in fetch_all(backend, names, workers):
+        if isinstance(result, Exception):
+            missing.append((community, gcm, variable, str(result)))
+            continue
+        days, temps = result
+        if gcm not in indexes:
+            indexes[gcm] = days
+        elif not np.array_equal(indexes[gcm], days):
+            missing.append(
+                (community, gcm, variable, "does not share the %s day index" % gcm)
+            )
+            continue
+        save_array(
+            os.path.join(output, datastore.columnar_path(community, gcm, variable)),
+            temps,
+        )
+        written += 1
+
+    for gcm, days in indexes.items():
+        save_array(os.path.join(output, "index", gcm + ".npy"), days)
+    manifest = {
+        "version": 1,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "units": "F",
+        "models": {
+            gcm: {"start": str(days[0]), "end": str(days[-1]), "days": len(days)}
+            for gcm, days in indexes.items()
+        },
+        "variables": datastore.variables,
+        "files": written,
+    }
+    with open(os.path.join(output, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return written, missing
+
+
+def build_cube(output, backend, names, workers=8, start="1980-01-01", end="2100-12-31"):
+    """
+    Write every file into one (community, model, variable, day) float32 array
+    on a shared daily axis from start to end, NaN where a model has no data.
+    Rows follow the order of names, i.e. CommunityList.json. cube.json marks
+    which (community, model, variable) rows were written; files that could
+    not be loaded or do not fit the axis are returned in missing instead.
+    """
+    start = np.datetime64(start, "D")
+    ndays = int((np.datetime64(end, "D") - start).astype(int)) + 1
+    shape = (len(names), len(datastore.models), len(datastore.variables), ndays)
+    os.makedirs(output, exist_ok=True)
+    path = os.path.join(output, "cube.npy")
+    tmp = path + ".tmp"
+    cube = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=shape)
+    cube[:] = np.nan
+
+    rows = {community: i for i, community in enumerate(names)}
+    covered = [
+        [[False for _ in datastore.variables] for _ in datastore.models] for _ in names
+    ]
+    spans = {}
+    missing = []
+    written = 0
+    for (community, gcm, variable), result in fetch_all(backend, names, workers):
+        if isinstance(result, Exception):
+            missing.append((community, gcm, variable, str(result)))
+            continue
+        days, temps = result
+        offsets = (days - start).astype(int)
+        span = [int(offsets[0]), int(offsets[-1]) + 1]
+        if offsets[0] < 0 or offsets[-1] >= ndays:
+            problem = "falls outside the cube's day axis"
+        elif np.any(np.diff(offsets) != 1):
+            problem = "is not a daily series"
+        elif spans.setdefault(gcm, span) != span:
+            problem = "does not share the %s day range" % gcm
+        else:
+            problem = None
+        if problem:
+            missing.append((community, gcm, variable, problem))
+            continue
+        m = datastore.models.index(gcm)
+        v = datastore.variables.index(variable)
+        cube[rows[community], m, v, span[0] : span[1]] = temps
+        covered[rows[community]][m][v] = True
+        written += 1
+
+    cube.flush()
+    del cube
+    os.replace(tmp, path)
+    meta = {
+        "version": 2,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "units": "F",
+        "start": str(start),
+        "communities": [datastore.community_stem(name) for name in names],
+        "models": datastore.models,
+        "variables": datastore.variables,
+        "spans": spans,
+        "covered": covered,
+        "files": written,
+    }
+    with open(os.path.join(output, "cube.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return written, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("output", help="directory to write the store to")
+    parser.add_argument(
+        "--format",
+        default="columnar",
+        choices=["columnar", "cube"],
+        help="per-file arrays, or one memory-mapped cube of every community",
+    )
+    parser.add_argument(
+        "--source",
+        default=os.environ.get("DATA_STORE", "s3"),
+        choices=["s3", "local"],
+        help="where to read the CSVs from (default: DATA_STORE or s3)",
+    )
+    parser.add_argument(
+        "--source-path",
+        default=os.environ.get("DATA_STORE_PATH"),
+        help="bucket prefix URL for s3, or mirror directory for local",
+    )
+    parser.add_argument("--communities", default="CommunityList.json")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    backend = datastore.make_backend(args.source, args.source_path)
+    names = community_names(args.communities)
+    start = time.perf_counter()
+    build = build_cube if args.format == "cube" else build_columnar
+    written, missing = build(args.output, backend, names, args.workers)
+    for community, gcm, variable, error in missing:
+        print("missing", community, gcm, variable, error, file=sys.stderr)
+    print(
+        "wrote %d files (%d missing) to %s in %.1fs"
+        % (written, len(missing), args.output, time.perf_counter() - start)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Sampling profiler for slow Dash callback requests.
+
+Set PROFILE_DIR to turn it on. While a callback request is in flight, a
+background thread samples the stacks of the threads working on it (the
+request thread and any chart executor tasks it started) every
+PROFILE_INTERVAL_MS (default 5). Requests that take at least PROFILE_SLOW_MS
+(default 1000), plus a random PROFILE_SAMPLE_RATE fraction of all callback
+requests (default 0), are saved to PROFILE_DIR as JSON holding the callback
+inputs, the latency and the sampled stacks in folded ("a;b;c count") form,
+which flamegraph.pl and speedscope read. At most PROFILE_MAX_FILES (default
+200) are kept.
+
+GET /_profiles lists the saved profiles and /_profiles/<name> downloads
+one (?format=folded for just the stacks). Both require PROFILE_TOKEN as
+?token= or an X-Profile-Token header, and answer 404 while it is unset.
+"""
+import contextlib
+import contextvars
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import flask
+
+slow_seconds = float(os.environ.get("PROFILE_SLOW_MS", 1000)) / 1000
+sample_rate = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+interval = float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000
+max_files = int(os.environ.get("PROFILE_MAX_FILES", 200))
+token = os.environ.get("PROFILE_TOKEN")
+
+current = contextvars.ContextVar("profile", default=None)
+
+_lock = threading.Lock()
+_threads = {}
+_wake = threading.Event()
+_sampler = None
+
+
+class Profile:
+    def __init__(self):
+        self.samples = Counter()
+        self.started = time.perf_counter()
+
+    def folded(self):
+        with _lock:
+            samples = Counter(self.samples)
+        return "".join(
+            "%s %d\n" % (";".join(stack), count)
+            for stack, count in samples.most_common()
+        )
+
+
+def _stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            "%s:%s"
+            % (
+                frame.f_globals.get("__name__", "?"),
+                getattr(code, "co_qualname", code.co_name),
+            )
+        )
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+def _sample():
+    while True:
+        _wake.wait()
+        time.sleep(interval)
+        frames = sys._current_frames()
+        with _lock:
+            if not _threads:
+                _wake.clear()
+                continue
+            for ident, profiles in _threads.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    stack = _stack(frame)
+                    for profile in profiles:
+                        profile.samples[stack] += 1
+
+
+def _watch(profile):
+    """Sample the calling thread for profile; False if it already is."""
+    global _sampler
+    ident = threading.get_ident()
+    with _lock:
+        profiles = _threads.setdefault(ident, [])
+        if profile in profiles:
+            return False
+        profiles.append(profile)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample, name="profiler", daemon=True)
+            _sampler.start()
+    _wake.set()
+    return True
+
+
+def _unwatch(profile):
+    ident = threading.get_ident()
+    with _lock:
+        profiles = _threads.get(ident, [])
+        if profile in profiles:
+            profiles.remove(profile)
+        if not profiles:
+            _threads.pop(ident, None)
+
+
+@contextlib.contextmanager
+def follow():
+    """
+    Sample the calling thread for the profile of the request it is working
+    for, if any; used by apps.executor for tasks run on its pool.
+    """
+    profile = current.get()
+    if profile is None or not _watch(profile):
+        yield
+        return
+    try:
+        yield
+    finally:
+        _unwatch(profile)
+
+
+def callback_inputs(body):
+    """{component id: value} for the inputs and state of a callback request."""
+    values = {}
+    for item in (body.get("inputs") or []) + (body.get("state") or []):
+        if isinstance(item, dict) and "id" in item:
+            values[str(item["id"])] = item.get("value")
+    return values
+
+
+class Store:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, record):
+        name = "%s-%s.json" % (time.strftime("%Y%m%dT%H%M%S"), uuid.uuid4().hex[:8])
+        path = os.path.join(self.root, name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(record, f)
+        os.replace(path + ".tmp", path)
+        self.prune()
+        return name
+
+    def names(self):
+        return sorted(
+            (name for name in os.listdir(self.root) if name.endswith(".json")),
+            reverse=True,
+        )
+
+    def prune(self):
+        for name in self.names()[max_files:]:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+    def load(self, name):
+        if os.path.basename(name) != name or not name.endswith(".json"):
+            return None
+        try:
+            with open(os.path.join(self.root, name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+def _authorize():
+    """Abort unless the request carries the configured token."""
+    if not token:
+        flask.abort(404)
+    given = flask.request.args.get("token") or flask.request.headers.get(
+        "X-Profile-Token", ""
+    )
+    if not hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8")):
+        flask.abort(403)
+
+
+def register(server, root, path="/_profiles"):
+    """Profile callback requests to server and serve the results."""
+    store = Store(root)
+
+    @server.before_request
+    def start_profile():
+        if not flask.request.path.endswith("_dash-update-component"):
+            return
+        profile = Profile()
+        flask.g.profile = profile
+        flask.g.profile_token = current.set(profile)
+        _watch(profile)
+
+    @server.teardown_request
+    def finish_profile(error=None):
+        profile = flask.g.pop("profile", None)
+        if profile is None:
+            return
+        elapsed = time.perf_counter() - profile.started
+        _unwatch(profile)
+        current.reset(flask.g.pop("profile_token"))
+        sampled = random.random() < sample_rate
+        if elapsed < slow_seconds and not sampled:
+            return
+        body = flask.request.get_json(silent=True) or {}
+        store.save(
+            {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "output": body.get("output"),
+                "inputs": callback_inputs(body),
+                "seconds": elapsed,
+                "reason": "slow" if elapsed >= slow_seconds else "sampled",
+                "error": repr(error) if error else None,
+                "interval": interval,
+                "samples": sum(profile.samples.values()),
+                "folded": profile.folded(),
+            }
+        )
+
+    def list_profiles():
+        _authorize()
+        listing = []
+        for name in store.names():
+            record = store.load(name)
+            if record is not None:
+                record.pop("folded", None)
+                listing.append(dict(record, name=name))
+        return flask.jsonify(listing)
+
+    def download_profile(name):
+        _authorize()
+        record = store.load(name)
+        if record is None:
+            flask.abort(404)
+        if flask.request.args.get("format") == "folded":
+            return record["folded"], 200, {"Content-Type": "text/plain"}
+        return flask.jsonify(record)
+
+    server.add_url_rule(path, "list_profiles", list_profiles)
+    server.add_url_rule(path + "/<name>", "download_profile", download_profile)
@@ -0,0 +1,66 @@
+"""
+Capture of Dash callback traffic for replaying later with apps.replay.
+
+Set RECORD_FILE to turn it on. Every callback request then appends one JSON
+line to that file holding the time it arrived, the callback's output, the
+request body as the renderer sent it (inputs, state and changed props), the
+response status and size in bytes, and the latency. Each line goes out in a
+single write to a file opened for appending, so several worker processes can
+share one file.
+"""
+import json
+import os
+import threading
+import time
+
+import flask
+
+_lock = threading.Lock()
+
+
+class Log:
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def append(self, record):
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with _lock:
+            os.write(self.fd, line)
+
+
+def register(server, path):
+    """Append every callback request made to server to the log at path."""
+    log = Log(path)
+
+    @server.before_request
+    def start_record():
+        if flask.request.path.endswith("_dash-update-component"):
+            flask.g.record_started = (time.time(), time.perf_counter())
+
+    @server.after_request
+    def measure_response(response):
+        if "record_started" in flask.g:
+            size = response.calculate_content_length()
+            flask.g.record_response = (response.status_code, size)
+        return response
+
+    @server.teardown_request
+    def finish_record(error=None):
+        started = flask.g.pop("record_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started[1]
+        status, size = flask.g.pop("record_response", (500, None))
+        body = flask.request.get_json(silent=True) or {}
+        log.append(
+            {
+                "time": started[0],
+                "output": body.get("output"),
+                "body": body,
+                "status": status,
+                "bytes": size,
+                "seconds": elapsed,
+                "error": repr(error) if error else None,
+            }
+        )
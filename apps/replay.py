@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Replay of callback traffic captured by apps.recorder, and comparison of the
+latencies of two runs.
+
+    python -m apps.replay run CAPTURE.jsonl --url URL [--speed 1]
+                              [--concurrency 16] [--output RUN.jsonl]
+    python -m apps.replay diff BEFORE.jsonl AFTER.jsonl
+
+"run" posts each captured request body to URL's _dash-update-component,
+spaced as they were captured; --speed 10 replays ten times faster and
+--speed 0 sends them as fast as --concurrency allows. The results are
+written in the capture's own format, so "diff" compares two replays (say of
+the same capture against two builds) or a replay against the capture
+itself, printing p50/p95/p99 latency per callback for each and how much the
+second changed.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from apps.loadtest import summarize
+
+
+def read_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replayable(record):
+    return (
+        isinstance(record, dict)
+        and isinstance(record.get("body"), dict)
+        and isinstance(record.get("time"), (int, float))
+    )
+
+
+def replay(records, url, speed=1.0, concurrency=16):
+    """
+    Re-issue the captured requests; one result record for each. Lines
+    without a request body or time are skipped (see replayable).
+    """
+    import requests
+
+    if not url.endswith("/"):
+        url += "/"
+    local = threading.local()
+    records = sorted(filter(replayable, records), key=lambda record: record["time"])
+    results = [None] * len(records)
+
+    def send(number, record):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        sent = time.time()
+        start = time.perf_counter()
+        status, size, error = 0, None, None
+        try:
+            response = session.post(
+                url + "_dash-update-component", json=record["body"], timeout=60
+            )
+            status, size = response.status_code, len(response.content)
+        except Exception as e:
+            error = repr(e)
+        results[number] = {
+            "time": sent,
+            "output": record.get("output"),
+            "body": record["body"],
+            "status": status,
+            "bytes": size,
+            "seconds": time.perf_counter() - start,
+            "error": error,
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        for number, record in enumerate(records):
+            if speed:
+                due = (record["time"] - records[0]["time"]) / speed
+                delay = due - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, number, record)
+    return results
+
+
+def by_output(records):
+    results = defaultdict(lambda: {"latencies": [], "errors": 0})
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        result = results[record.get("output")]
+        if (
+            record.get("error")
+            or (record.get("status") or 0) >= 400
+            or not isinstance(record.get("seconds"), (int, float))
+        ):
+            result["errors"] += 1
+        else:
+            result["latencies"].append(record["seconds"])
+    return dict(results)
+
+
+def duration(records):
+    times = [
+        record["time"]
+        for record in records
+        if isinstance(record, dict) and isinstance(record.get("time"), (int, float))
+    ]
+    return max(max(times) - min(times), 1e-9) if times else 1e-9
+
+
+def diff(before, after):
+    """{output: (row before, row after)} with summarize's rows."""
+    rows_before = summarize(by_output(before), duration(before))
+    rows_after = summarize(by_output(after), duration(after))
+    return {
+        output: (rows_before.get(output), rows_after.get(output))
+        for output in sorted(set(rows_before) | set(rows_after), key=str)
+    }
+
+
+def print_diff(rows):
+    print(
+        "%-22s %6s %22s %22s %22s"
+        % ("callback", "errors", "p50 ms", "p95 ms", "p99 ms")
+    )
+    for output, (before, after) in rows.items():
+        cells = []
+        for key in ("p50", "p95", "p99"):
+            if before and after:
+                change = (
+                    "%+.0f%%" % ((after[key] / before[key] - 1) * 100)
+                    if before[key]
+                    else ""
+                )
+                cells.append(
+                    "%7.1f > %7.1f %5s"
+                    % (before[key] * 1000, after[key] * 1000, change)
+                )
+            else:
+                row = before or after
+                cells.append(
+                    "%22s"
+                    % ("%s only %.1f" % ("1st" if before else "2nd", row[key] * 1000))
+                )
+        errors = "%s>%s" % tuple(
+            round(row["requests"] * row["error_rate"]) if row else "-"
+            for row in (before, after)
+        )
+        print("%-22s %6s %s" % (output, errors, " ".join(cells)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="replay a capture against an instance")
+    run.add_argument("capture")
+    run.add_argument("--url", required=True)
+    run.add_argument("--speed", type=float, default=1.0)
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--output", help="write the results to this file")
+    compare = commands.add_parser("diff", help="compare the latencies of two runs")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        print_diff(diff(read_log(args.before), read_log(args.after)))
+        return
+
+    captured = read_log(args.capture)
+    skipped = len(captured) - len(list(filter(replayable, captured)))
+    if skipped:
+        print("skipping %d lines without a request body or time" % skipped)
+    results = replay(captured, args.url, args.speed, args.concurrency)
+    if args.output:
+        with open(args.output, "w") as f:
+            for record in results:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    print("replayed %d requests" % len(results))
+    print_diff(diff(captured, results))
+
+
+if __name__ == "__main__":
+    main()
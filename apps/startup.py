@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long a fresh worker takes to import the app, and how
+much memory it holds afterwards.
+
+    python -m apps.startup [--runs 5] [--module index] [--top 15] [--output FILE]
+
+Each run imports the module in a new interpreter and records the wall time
+of the import and the resident set size once it is done. The median over
+the runs is reported, with the packages that took longest to import in an
+extra run under `python -X importtime`. With --output, the summary is
+appended to FILE as a JSON line so releases can be compared.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+child = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+except OSError:
+    pass
+print(json.dumps({"seconds": seconds, "rss_kb": rss_kb, "modules": len(sys.modules)}))
+"""
+
+
+def run(module, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    env = dict(os.environ)
+    env.setdefault("DASH_REQUESTS_PATHNAME_PREFIX", "/")
+    result = subprocess.run(
+        command + ["-c", child, module],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_packages(importtime_output, top):
+    """
+    [(package, seconds)] for the top-level packages with the largest
+    cumulative import time.
+    """
+    packages = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        if "." in name or not cumulative.strip().isdigit():
+            continue
+        packages[name] = max(packages.get(name, 0), int(cumulative) / 1e6)
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def benchmark(module="index", runs=5, top=15):
+    samples = [run(module)[0] for _ in range(runs)]
+    _, importtime_output = run(module, importtime=True)
+    return {
+        "module": module,
+        "runs": runs,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "seconds": statistics.median(sample["seconds"] for sample in samples),
+        "rss_mb": statistics.median(sample["rss_kb"] for sample in samples) / 1024,
+        "modules": samples[-1]["modules"],
+        "slowest": slowest_packages(importtime_output, top),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="index")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="append the summary to this JSONL file")
+    args = parser.parse_args(argv)
+
+    summary = benchmark(args.module, args.runs, args.top)
+    print(
+        "import %s: %.3fs median of %d runs, %.1f MB RSS, %d modules"
+        % (
+            summary["module"],
+            summary["seconds"],
+            summary["runs"],
+            summary["rss_mb"],
+            summary["modules"],
+        )
+    )
+    for package, seconds in summary["slowest"]:
+        print("  %-30s %8.1f ms" % (package, seconds * 1000))
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(summary) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Pre-render charts so the first visitors after a deploy hit warm caches.
+
+    python -m apps.warmup [COMMUNITY ...] [--all] [--workers N]
+
+Renders every tab, threshold and model combination for the given
+communities (default: a few of the most visited), filling the data cache and
+the figure cache with each chart and with the projected traces sent when
+only the model changes. Run standalone, this only helps workers if
+FIGURE_CACHE_DIR points them at a shared figure cache. To warm each worker
+in the background on startup instead, set WARMUP_COMMUNITIES to a comma
+separated list of communities or to "all".
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from apps import communities, gdd, growing_season
+
+popular = ["Fairbanks", "Anchorage", "Juneau"]
+gcms = ["GFDL", "NCAR"]
+
+log = logging.getLogger(__name__)
+
+
+def jobs(names):
+    from apps import annual_min, cumulative_gdd, logs
+
+    for community in names:
+        for gcm in gcms:
+            for threshold in growing_season.thresholds:
+                args = (community, threshold, gcm)
+                yield "logs", logs.build_chart, args
+                yield "logs", logs.projected_traces, args
+            args = (community, gcm)
+            yield "annual_min", annual_min.build_chart, args
+            yield "annual_min", annual_min.projected_traces, args
+            for threshold in gdd.thresholds:
+                args = (community, threshold, gcm)
+                yield "cumulative_gdd", cumulative_gdd.build_chart, args
+                yield "cumulative_gdd", cumulative_gdd.projected_traces, args
+
+
+def warm(names, workers=4, report=print, summary=None):
+    """
+    Render every chart for names on a pool of workers, passing a line per
+    chart to report and a closing summary line to summary (default report).
+    Returns a list of (tab, inputs, seconds, error) per chart.
+    """
+    summary = summary or report
+
+    def render(job):
+        tab, chart, args = job
+        start = time.perf_counter()
+        error = None
+        try:
+            chart(*args)
+        except Exception as e:
+            error = e
+        elapsed = time.perf_counter() - start
+        if report:
+            report(
+                "%-15s %-40s %8.1f ms%s"
+                % (tab, args, elapsed * 1000, " " + repr(error) if error else "")
+            )
+        return tab, args, elapsed, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(render, jobs(names)))
+    total = time.perf_counter() - start
+    if summary:
+        latencies = sorted(elapsed for _, _, elapsed, _ in results)
+        errors = sum(1 for result in results if result[3] is not None)
+        summary(
+            "warmed %d charts for %d communities in %.1fs "
+            "(median %.1f ms, max %.1f ms, %d errors)"
+            % (
+                len(results),
+                len(names),
+                total,
+                latencies[len(latencies) // 2] * 1000 if latencies else 0,
+                latencies[-1] * 1000 if latencies else 0,
+                errors,
+            )
+        )
+    return results
+
+
+def resolve(requested):
+    if requested == ["all"]:
+        return communities.names()
+    known = set(communities.names())
+    unknown = [name for name in requested if name not in known]
+    if unknown:
+        raise ValueError("Unknown communities: " + ", ".join(unknown))
+    return requested
+
+
+def start_background(setting, workers=2):
+    """
+    Warm up on a daemon thread from a WARMUP_COMMUNITIES style setting,
+    logging each chart at debug level and the summary at info.
+    """
+    names = resolve([name.strip() for name in setting.split(",") if name.strip()])
+    thread = threading.Thread(
+        target=warm,
+        args=(names, workers, log.debug, log.info),
+        name="warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("communities", nargs="*", default=popular)
+    parser.add_argument("--all", action="store_true", help="warm every community")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DASH_REQUESTS_PATHNAME_PREFIX", "/")
+    names = resolve(["all"] if args.all else args.communities)
+    warm(names, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,23 @@ from application import app, application
 
 path_prefix = os.environ["DASH_REQUESTS_PATHNAME_PREFIX"]
 
-from apps import common, logs, annual_min, cumulative_gdd, hardiness
+from apps import common, logs, annual_min, cumulative_gdd, hardiness, warmup
+from apps import browsercache, metrics, profiler, recorder
 
 server = flask.Flask(__name__)
 
+if metrics.enabled:
+    metrics.register(app.server)
+
+if os.environ.get("PROFILE_DIR"):
+    profiler.register(app.server, os.environ["PROFILE_DIR"])
+
+if os.environ.get("RECORD_FILE"):
+    recorder.register(app.server, os.environ["RECORD_FILE"])
+
+if os.environ.get("WARMUP_COMMUNITIES"):
+    warmup.start_background(os.environ["WARMUP_COMMUNITIES"])
+
 app.index_string = f"""
 <!DOCTYPE html>
 <html>
@@ -55,6 +68,7 @@ app.layout = html.Div(
         html.Div(id="page-content"),
         common.footer(),
     ]
+    + browsercache.shared_stores()
 )
 app.title = "Alaska Garden Helper"
 
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+# The app modules read this at import time, and season.csv, gdd.csv and
+# CommunityList.json relative to the working directory.
+os.environ.setdefault("DASH_REQUESTS_PATHNAME_PREFIX", "/")
+os.chdir(root)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """A test client for the whole app, reading generated community data."""
+    from apps import benchmarks
+
+    benchmarks.install_fixtures()
+    import index
+
+    return index.app.server.test_client()
@@ -0,0 +1,119 @@
+"""The browser figure cache's lookup and store functions, run in node."""
+import json
+import shutil
+import subprocess
+
+import dash
+import pytest
+
+from apps import browsercache
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+
+no_update = "no_update"
+version = "1/json"
+
+
+def run_js(function, *args):
+    script = """
+    var window = {dash_clientside: {no_update: %s}};
+    var f = %s;
+    console.log(JSON.stringify(f.apply(null, %s)));
+    """ % (
+        json.dumps(no_update),
+        function,
+        json.dumps(args),
+    )
+    result = subprocess.run(
+        ["node"], input=script, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def lookup(*args):
+    return run_js(browsercache.lookup % {"graph": json.dumps("tcharts")}, *args)
+
+
+def store(response, cache, max_chars=100000):
+    return run_js(
+        browsercache.store % {"max_chars": max_chars}, response, cache, version
+    )
+
+
+def build_chart(community, threshold, gcm):
+    return {"data": [{"name": "%s %s %s" % (community, threshold, gcm)}], "layout": {}}
+
+
+def respond(request):
+    """The server half of the round trip, through a Dash app's callback."""
+    app = dash.Dash(__name__)
+    app.layout = dash.html.Div(
+        [dash.dcc.Store(id="tcharts-request"), dash.dcc.Store(id="tcharts-response")]
+    )
+    browsercache.register(
+        app, "tcharts", ["community", "threshold", "gcm"], build_chart
+    )
+    response = app.server.test_client().post(
+        "/_dash-update-component",
+        json={
+            "output": "tcharts-response.data",
+            "outputs": {"id": "tcharts-response", "property": "data"},
+            "inputs": [{"id": "tcharts-request", "property": "data", "value": request}],
+            "changedPropIds": ["tcharts-request.data"],
+            "state": [],
+        },
+    )
+    assert response.status_code == 200
+    return response.get_json()["response"]["tcharts-response"]["data"]
+
+
+def test_round_trip():
+    figure, request = lookup("Nome", 32, "GFDL", None, version)
+    assert figure == no_update
+    assert request["inputs"] == ["Nome", 32, "GFDL"]
+
+    response = respond(request)
+    assert response == {
+        "key": request["key"],
+        "figure": build_chart("Nome", 32, "GFDL"),
+    }
+
+    drawn, cache = store(response, None)
+    assert drawn == response["figure"]
+    assert cache["version"] == version
+    assert cache["order"] == [request["key"]]
+
+    figure, request = lookup("Nome", 32, "GFDL", cache, version)
+    assert figure == response["figure"]
+    assert request == no_update
+
+    # Other inputs, or a new data version, go back to the server.
+    assert lookup("Nome", 40, "GFDL", cache, version)[0] == no_update
+    assert lookup("Nome", 32, "GFDL", cache, "2/json")[0] == no_update
+
+
+def test_new_version_discards_entries():
+    cache = store({"key": "a", "figure": build_chart("Nome", 32, "GFDL")}, None)[1]
+    cache["version"] = "0/json"
+    cache = store({"key": "b", "figure": build_chart("Nome", 40, "GFDL")}, cache)[1]
+    assert cache["version"] == version
+    assert cache["order"] == ["b"]
+
+
+def test_oldest_entries_are_evicted():
+    size = len(json.dumps(build_chart("Nome", 32, "GFDL"), separators=(",", ":")))
+    cache = None
+    for key in ["a", "b", "c"]:
+        response = {"key": key, "figure": build_chart("Nome", 32, "GFDL")}
+        drawn, cache = store(response, cache, max_chars=2 * size)
+        assert drawn == response["figure"]
+    assert cache["order"] == ["b", "c"]
+    assert sorted(cache["entries"]) == ["b", "c"]
+    assert cache["chars"] == 2 * size
+
+
+def test_oversized_figures_are_drawn_but_not_kept():
+    response = {"key": "a", "figure": build_chart("Nome", 32, "GFDL")}
+    drawn, cache = store(response, None, max_chars=10)
+    assert drawn == response["figure"]
+    assert cache == no_update
@@ -0,0 +1,91 @@
+"""Eviction, expiry and statistics of apps.cache.LRUCache."""
+import types
+
+import pandas as pd
+
+from apps import cache as cache_module
+from apps.cache import LRUCache
+
+
+def sized(value):
+    return len(value)
+
+
+def test_evicts_least_recently_used_past_max_bytes():
+    cache = LRUCache(max_bytes=10, sizer=sized)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    assert cache.get("a") == "xxxx"
+    cache.set("c", "xxxx")
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxxx"
+    assert cache.get("c") == "xxxx"
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_replacing_an_entry_updates_its_size():
+    cache = LRUCache(max_bytes=10, sizer=sized)
+    cache.set("a", "xxxx")
+    cache.set("a", "xxxxxx")
+    assert cache.stats()["bytes"] == 6
+    assert cache.stats()["entries"] == 1
+
+
+def test_value_larger_than_max_bytes_is_not_kept():
+    cache = LRUCache(max_bytes=10, sizer=sized)
+    cache.set("a", "xxxx")
+    cache.set("big", "x" * 11)
+    assert cache.get("big") is None
+    # Skipping it evicts nothing, and drops any older value for the key.
+    assert cache.get("a") == "xxxx"
+    cache.set("a", "x" * 11)
+    assert cache.get("a", "default") == "default"
+    assert cache.stats()["bytes"] == 0
+    assert cache.stats()["evictions"] == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    clock = types.SimpleNamespace(monotonic=lambda: now[0])
+    monkeypatch.setattr(cache_module, "time", clock)
+    cache = LRUCache(ttl=5, sizer=sized)
+    cache.set("a", "xxxx")
+    now[0] += 5
+    assert cache.get("a") == "xxxx"
+    now[0] += 0.1
+    assert cache.get("a") is None
+    assert cache.peek("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+    assert stats["bytes"] == 0
+
+
+def test_stats_counters():
+    cache = LRUCache(max_bytes=100, sizer=sized)
+    cache.get("a")
+    cache.set("a", "xx")
+    cache.get("a")
+    cache.get("a")
+    cache.peek("a")
+    cache.peek("b")
+    assert cache.stats() == {
+        "entries": 1,
+        "bytes": 2,
+        "max_bytes": 100,
+        "hits": 2,
+        "misses": 1,
+        "evictions": 0,
+        "expirations": 0,
+    }
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+    assert cache.stats()["hits"] == 2
+
+
+def test_frames_are_sized_by_their_memory():
+    df = pd.DataFrame({"temp": range(1000)}, dtype="float64")
+    assert cache_module.sizeof(df) >= 8000
+    assert cache_module.sizeof(b"abc") == 3
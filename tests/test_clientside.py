@@ -0,0 +1,83 @@
+"""Per-community chart bundles and their assembly in the browser."""
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from apps import benchmarks, clientside, cumulative_gdd, logs
+
+
+def fake_chart(community, threshold, gcm):
+    return {
+        "data": [
+            {"name": "%s ERA %s" % (community, threshold)},
+            {"name": "%s %s %s" % (community, gcm, threshold)},
+        ],
+        "layout": {"title": "%s %s" % (gcm, threshold), "height": 400},
+    }
+
+
+def test_bundle_layout():
+    result = clientside.bundle(fake_chart, 1, "Nome", [28, 32])
+    assert result == {
+        "layout": {"height": 400},
+        "historical": {
+            28: [{"name": "Nome ERA 28"}],
+            32: [{"name": "Nome ERA 32"}],
+        },
+        "projected": {
+            "GFDL": {28: [{"name": "Nome GFDL 28"}], 32: [{"name": "Nome GFDL 32"}]},
+            "NCAR": {28: [{"name": "Nome NCAR 28"}], 32: [{"name": "Nome NCAR 32"}]},
+        },
+        "titles": {
+            "GFDL": {28: "GFDL 28", 32: "GFDL 32"},
+            "NCAR": {28: "NCAR 28", 32: "NCAR 32"},
+        },
+    }
+
+
+def run_assemble(bundle, selections):
+    """Results of the clientside assemble function in node, one per selection."""
+    script = """
+    var window = {dash_clientside: {no_update: "no_update"}};
+    var assemble = %s;
+    var bundle = %s;
+    console.log(JSON.stringify(%s.map(function (s) {
+        return assemble(bundle, s[0], s[1]);
+    })));
+    """ % (
+        clientside.assemble,
+        json.dumps(bundle),
+        json.dumps(selections),
+    )
+    result = subprocess.run(
+        ["node"], input=script, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+@pytest.mark.parametrize("module", [logs, cumulative_gdd], ids=lambda m: m.__name__)
+def test_assembled_figures_match_server(module):
+    benchmarks.install_fixtures()
+    bundle = module.chart_bundle(benchmarks.community)
+    selections = [
+        (threshold, gcm)
+        for threshold in bundle["historical"]
+        for gcm in clientside.gcms
+    ]
+    assembled = run_assemble(bundle, selections)
+    for (threshold, gcm), figure in zip(selections, assembled):
+        expected = module.build_chart(benchmarks.community, threshold, gcm)
+        assert figure == json.loads(json.dumps(expected))
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_missing_selection_is_not_updated():
+    bundle = clientside.bundle(fake_chart, 1, "Nome", [32])
+    assert run_assemble(bundle, [[50, "GFDL"], [32, "CCSM"]]) == [
+        "no_update",
+        "no_update",
+    ]
+    assert run_assemble(None, [[32, "GFDL"]]) == ["no_update"]
@@ -0,0 +1,83 @@
+"""Caching and coalescing of series loads in apps.datastore."""
+import threading
+import time
+
+import pytest
+
+from apps import benchmarks, datastore
+from apps.cache import SingleFlight
+
+
+class CountingBackend(datastore.MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.loads = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def series(self, community, gcm, variable):
+        self.loads += 1
+        assert self.release.wait(10)
+        return super().series(community, gcm, variable)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(datastore, "flights", SingleFlight())
+    previous = datastore.backend
+    counting = CountingBackend()
+    counting.add(
+        datastore.data_path("Fairbanks", "ERA", "min"),
+        benchmarks.fixture_csv("ERA", "min"),
+    )
+    datastore.set_backend(counting)
+    yield counting
+    datastore.set_backend(previous)
+
+
+def test_cached_series_is_loaded_once(backend):
+    first = datastore.load_series("Fairbanks", "ERA", "min")
+    assert datastore.load_series("Fairbanks", "ERA", "min") is first
+    assert backend.loads == 1
+
+
+def test_flight_after_cache_miss_uses_cached_series(backend, monkeypatch):
+    # A caller whose cache lookup ran before another flight stored the series,
+    # and whose own flight starts after that one has ended.
+    loads = datastore.load_stats()["loads"]
+    first = datastore.load_series("Fairbanks", "ERA", "min")
+    monkeypatch.setattr(datastore.cache, "get", lambda key, default=None: None)
+    assert datastore.load_series("Fairbanks", "ERA", "min") is first
+    assert backend.loads == 1
+    stats = datastore.load_stats()
+    assert stats["flights"] == 2
+    assert stats["loads"] == loads + 1
+
+
+def test_concurrent_loads_are_coalesced(backend):
+    count = 8
+    backend.release.clear()
+    results = [None] * count
+
+    def load(number):
+        results[number] = datastore.load_series("Fairbanks", "ERA", "min")
+
+    threads = [threading.Thread(target=load, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    # Let every thread join the flight before the backend answers.
+    deadline = time.monotonic() + 10
+    while datastore.flights.stats()["deduplicated"] < count - 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    backend.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert backend.loads == 1
+    assert datastore.flights.stats() == {
+        "flights": 1,
+        "deduplicated": count - 1,
+        "in_flight": 0,
+    }
+    assert all(result is results[0] for result in results)
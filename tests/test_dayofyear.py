@@ -0,0 +1,75 @@
+"""Per-calendar-day aggregation in apps.dayofyear, against string groupby."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from apps import dayofyear
+
+
+def series(start, end, drop_feb_29=False, seed=0):
+    days = pd.date_range(start, end, freq="D", name="time")
+    if drop_feb_29:
+        days = days[~((days.month == 2) & (days.day == 29))]
+    rng = np.random.default_rng(seed)
+    temp = rng.normal(0, 10, len(days))
+    temp[rng.random(len(days)) < 0.05] = np.nan
+    return pd.DataFrame({"temp": temp}, index=days)
+
+
+def string_groupby(df, start, length, how):
+    """The per-period groupby on "MM-DD" strings by_period replaced."""
+    period = df[(df.index.year >= start) & (df.index.year < start + length)]
+    grouped = period["temp"].groupby(period.index.strftime("%m-%d")).agg(how)
+    return grouped.reindex(dayofyear.day_categories).values
+
+
+@pytest.mark.parametrize("how", ["min", "mean", "max"])
+@pytest.mark.parametrize("drop_feb_29", [False, True], ids=["leap", "no-feb-29"])
+def test_matches_string_groupby(how, drop_feb_29):
+    df = series("1979-06-01", "2041-03-31", drop_feb_29)
+    starts = [1980, 1990, 2010, 2035]
+    result = dayofyear.by_period(df, starts, 10, how)
+    assert result.shape == (len(starts), 366)
+    for start, row in zip(starts, result):
+        expected = string_groupby(df, start, 10, how)
+        np.testing.assert_allclose(row, expected, rtol=1e-12, equal_nan=True)
+    feb_29 = result[:, dayofyear.FEB_29]
+    assert np.isnan(feb_29).all() == drop_feb_29
+    # 2035-2044 runs past the end of the data.
+    assert not np.isnan(result[-1]).all()
+
+
+def test_days_with_only_missing_values():
+    df = series("2010-01-01", "2019-12-31")
+    df.loc[df.index.strftime("%m-%d") == "07-04", "temp"] = np.nan
+    (row,) = dayofyear.by_period(df, [2010], 10, "min")
+    assert np.isnan(row[dayofyear.day_categories.index("07-04")])
+    assert not np.isnan(row[dayofyear.day_categories.index("07-05")])
+    np.testing.assert_array_equal(row, string_groupby(df, 2010, 10, "min"))
+
+
+def test_calendar_bins():
+    index = pd.DatetimeIndex(["2011-02-28", "2011-03-01", "2012-02-29", "2012-03-01"])
+    assert list(dayofyear.calendar_bins(index)) == [58, 60, 59, 60]
+    assert dayofyear.day_categories[59] == "02-29"
+
+
+def test_annual_min_days_line_up(monkeypatch):
+    # x was once every date string of the 30 years while y held one value per
+    # calendar day, so from March on a period starting in a non-leap year
+    # showed each day's minimum against the wrong date.
+    from apps import annual_min
+
+    df = series("2010-01-01", "2099-12-31", seed=1)
+    monkeypatch.setattr(annual_min.datastore, "load_series", lambda *args: df)
+    figure = {"data": []}
+    annual_min.add_traces("Fairbanks", "GFDL", figure)
+
+    trace = figure["data"][0]
+    assert trace["name"].startswith("2010-2039")
+    assert len(trace["x"]) == len(trace["y"]) == 366
+    period = df[df.index.year < 2040]["temp"]
+    days = period.index.strftime("%m-%d")
+    for day in ["01-01", "02-28", "02-29", "03-01", "07-04", "12-31"]:
+        (position,) = np.flatnonzero(trace["x"] == day)
+        assert trace["y"][position] == period[days == day].min()
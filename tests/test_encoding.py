@@ -0,0 +1,113 @@
+"""The compact figure encoding in apps.encoding, decoded back."""
+import base64
+import importlib
+
+import numpy as np
+import pytest
+
+from apps import encoding
+from apps.dayofyear import day_categories
+
+
+def decode(array):
+    return np.frombuffer(base64.b64decode(array["bdata"]), dtype=array["dtype"])
+
+
+def test_trace_arrays_round_trip():
+    x = np.array(["01-01", "02-29", "03-01", "12-31"], dtype=object)
+    y = np.array([-12.3456, 0.004, 32.125, 99.999])
+    trace = encoding.compact_trace({"x": x, "y": y, "mode": "markers"})
+
+    assert trace["x"]["dtype"] == "i2"
+    assert list(decode(trace["x"])) == [0, 59, 60, 365]
+    assert [day_categories[i] for i in decode(trace["x"])] == list(x)
+    assert trace["y"]["dtype"] == "f4"
+    np.testing.assert_array_equal(
+        decode(trace["y"]), np.round(y, encoding.precision).astype(np.float32)
+    )
+    assert trace["mode"] == "markers"
+
+
+def test_trace_is_copied():
+    original = {"x": ["01-01"], "y": np.array([1.0]), "text": np.array([1.0])}
+    encoding.compact_trace(original)
+    assert original["x"] == ["01-01"]
+    assert isinstance(original["y"], np.ndarray)
+    assert "text" in original
+
+
+def test_text_dropped_when_hover_shows_only_y():
+    values = np.array([1.234, 5.678])
+    trace = encoding.compact_trace(
+        {"x": ["01-01", "01-02"], "y": values, "text": values, "hoverinfo": "y"}
+    )
+    assert "text" not in trace
+
+
+def test_text_kept_when_hover_shows_it():
+    values = np.array([1.234, 5.678])
+    trace = encoding.compact_trace(
+        {"x": ["01-01", "01-02"], "y": values, "text": values, "hoverinfo": "text+y"}
+    )
+    assert trace["text"] == [1.23, 5.68]
+    # Text labels that are not numbers pass through.
+    trace = encoding.compact_trace(
+        {"x": ["01-01"], "y": values[:1], "text": "2010-2019", "hoverinfo": "text+y"}
+    )
+    assert trace["text"] == "2010-2019"
+
+
+def test_non_day_x_is_left_alone():
+    trace = encoding.compact_trace({"x": [1980, 1981], "y": [10, 20]})
+    assert trace == {"x": [1980, 1981], "y": [10, 20]}
+
+
+def test_category_axis_becomes_month_ticks():
+    layout = {
+        "xaxis": {
+            "type": "category",
+            "categoryarray": list(day_categories),
+            "title": "Day of year",
+        }
+    }
+    figure = encoding.compact_figure({"data": [], "layout": layout})
+    xaxis = figure["layout"]["xaxis"]
+
+    assert "categoryarray" not in xaxis
+    assert xaxis["type"] == "linear"
+    assert xaxis["title"] == "Day of year"
+    assert xaxis["range"] == [-0.5, 365.5]
+    assert len(xaxis["tickvals"]) == 12
+    assert xaxis["ticktext"][:3] == ["01-01", "02-01", "03-01"]
+    assert [day_categories[i] for i in xaxis["tickvals"]] == xaxis["ticktext"]
+    assert "categoryarray" in layout["xaxis"]
+
+
+@pytest.mark.parametrize(
+    "module, args",
+    [
+        ("annual_min", ("Fairbanks", "GFDL")),
+        ("cumulative_gdd", ("Fairbanks", 32, "GFDL")),
+    ],
+)
+def test_chart_decodes_to_json_encoding(client, monkeypatch, module, args):
+    chart = importlib.import_module("apps." + module).build_chart.uncached
+    monkeypatch.setattr(encoding, "mode", "json")
+    plain = chart(*args)
+    monkeypatch.setattr(encoding, "mode", "compact")
+    compact = chart(*args)
+
+    assert len(compact["data"]) == len(plain["data"])
+    for trace, expected in zip(compact["data"], plain["data"]):
+        days = [day_categories[i] for i in decode(trace["x"])]
+        assert days == list(expected["x"])
+        np.testing.assert_allclose(
+            decode(trace["y"]),
+            np.round(np.asarray(expected["y"], dtype=float), 2),
+            atol=1e-4,
+        )
+        if expected["hoverinfo"] == "y":
+            assert "text" not in trace
+        else:
+            assert trace["text"] == expected["text"]
+    assert "categoryarray" not in compact["layout"]["xaxis"]
@@ -0,0 +1,266 @@
+"""apps.fetch against a local stand-in for the bucket."""
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from apps import fetch
+
+
+class Origin(ThreadingHTTPServer):
+    """
+    Answers each path from a script of steps, one per request (the last is
+    repeated): a status code, or ("sleep", seconds) before answering 200.
+    200s carry an ETag, and a matching If-None-Match gets a 304. A path's
+    body may be a list, served in turn.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), OriginHandler)
+        self.lock = threading.Lock()
+        self.scripts = {}
+        self.bodies = {}
+        self.requests = Counter()
+        self.not_modified = Counter()
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    def url(self, path):
+        return "http://127.0.0.1:%d%s" % (self.server_address[1], path)
+
+    def step(self, path):
+        with self.lock:
+            self.requests[path] += 1
+            script = self.scripts.get(path, [200])
+            return script.pop(0) if len(script) > 1 else script[0]
+
+    def body(self, path):
+        body = self.bodies.get(path, b"body of " + path.encode())
+        if isinstance(body, list):
+            with self.lock:
+                return body[self.requests[path] % len(body)]
+        return body
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.most_in_flight = max(server.most_in_flight, server.in_flight)
+        try:
+            self.answer(server.step(self.path))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def answer(self, step):
+        if isinstance(step, tuple):
+            time.sleep(step[1])
+            step = 200
+        if step != 200:
+            self.send_response(step)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.server.body(self.path)
+        etag = '"%x"' % zlib.crc32(body)
+        if self.headers.get("If-None-Match") == etag:
+            with self.server.lock:
+                self.server.not_modified[self.path] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    server = Origin()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    """fetch as configured by these HTTP_* settings, restored afterwards."""
+    settings = {
+        "HTTP_RETRIES": "2",
+        "HTTP_BACKOFF": "0",
+        "HTTP_TIMEOUT": "0.3",
+        "HTTP_MAX_CONCURRENCY": "2",
+    }
+    for name, value in settings.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("HTTP_CACHE_DIR", raising=False)
+    yield importlib.reload(fetch)
+    for name in settings:
+        monkeypatch.delenv(name)
+    monkeypatch.undo()
+    importlib.reload(fetch)
+
+
+def test_retries_then_succeeds(configured, origin):
+    origin.scripts["/flaky.csv"] = [503, 503, 200]
+    response = configured.get(origin.url("/flaky.csv"))
+    assert response.status_code == 200
+    assert response.content == b"body of /flaky.csv"
+    assert origin.requests["/flaky.csv"] == 3
+
+
+def test_error_status_once_retries_are_exhausted(configured, origin):
+    origin.scripts["/down.csv"] = [503]
+    with pytest.raises(requests.HTTPError) as raised:
+        configured.get(origin.url("/down.csv"))
+    assert raised.value.response.status_code == 503
+    assert isinstance(raised.value, OSError)
+    # The first try and HTTP_RETRIES retries.
+    assert origin.requests["/down.csv"] == 3
+
+
+def test_missing_file_is_not_retried(configured, origin):
+    origin.scripts["/missing.csv"] = [404]
+    with pytest.raises(requests.HTTPError):
+        configured.get(origin.url("/missing.csv"))
+    assert origin.requests["/missing.csv"] == 1
+
+
+def test_timeout(configured, origin):
+    origin.scripts["/slow.csv"] = [("sleep", 1)]
+    start = time.perf_counter()
+    with pytest.raises(requests.RequestException) as raised:
+        configured.get(origin.url("/slow.csv"))
+    assert isinstance(raised.value, OSError)
+    assert "timed out" in str(raised.value)
+    assert time.perf_counter() - start < 3 * 0.3 + 0.5
+    assert origin.requests["/slow.csv"] == 3
+
+
+def test_concurrency_limit(configured, origin):
+    origin.scripts["/slow.csv"] = [("sleep", 0.1)]
+    errors = []
+
+    def fetch_one():
+        try:
+            configured.get(origin.url("/slow.csv"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch_one) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert origin.requests["/slow.csv"] == 8
+    assert origin.most_in_flight == 2
+
+
+def test_cache_revalidates(configured, origin, tmp_path):
+    cache = configured.HTTPCache(str(tmp_path), max_age=0)
+    url = origin.url("/a.csv")
+    assert cache.get_bytes(url) == b"body of /a.csv"
+    assert cache.get_bytes(url) == b"body of /a.csv"
+    assert origin.requests["/a.csv"] == 2
+    assert origin.not_modified["/a.csv"] == 1
+    assert cache.stats() == {"hits": 0, "revalidated": 1, "downloads": 1, "stale": 0}
+
+    origin.bodies["/a.csv"] = b"changed"
+    assert cache.get_bytes(url) == b"changed"
+    assert cache.get_bytes(url) == b"changed"
+    assert origin.not_modified["/a.csv"] == 2
+    assert cache.stats()["downloads"] == 2
+
+
+def test_cache_max_age(configured, origin, tmp_path):
+    cache = configured.HTTPCache(str(tmp_path), max_age=60)
+    url = origin.url("/a.csv")
+    cache.get_bytes(url)
+    cache.get_bytes(url)
+    assert origin.requests["/a.csv"] == 1
+    assert cache.stats()["hits"] == 1
+
+    (name,) = os.listdir(str(tmp_path))
+    checked = time.time() - 61
+    os.utime(os.path.join(str(tmp_path), name), (checked, checked))
+    assert cache.get_bytes(url) == b"body of /a.csv"
+    assert origin.requests["/a.csv"] == 2
+    assert cache.stats()["revalidated"] == 1
+    # Revalidating renewed the entry for another max_age.
+    cache.get_bytes(url)
+    assert origin.requests["/a.csv"] == 2
+    assert cache.stats()["hits"] == 2
+
+
+def test_cache_serves_stale_copy(configured, origin, tmp_path):
+    cache = configured.HTTPCache(str(tmp_path), max_age=0)
+    url = origin.url("/a.csv")
+    cache.get_bytes(url)
+    origin.scripts["/a.csv"] = [503]
+    assert cache.get_bytes(url) == b"body of /a.csv"
+    assert cache.stats()["stale"] == 1
+
+    origin.shutdown()
+    origin.server_close()
+    assert cache.get_bytes(url) == b"body of /a.csv"
+    assert cache.stats()["stale"] == 2
+    with pytest.raises(OSError):
+        cache.get_bytes(origin.url("/never-fetched.csv"))
+
+
+shared_reader = """
+import sys
+from apps import fetch
+root, url, max_age, size = sys.argv[1], sys.argv[2], float(sys.argv[3]), int(sys.argv[4])
+cache = fetch.HTTPCache(root, max_age)
+for _ in range(20):
+    body = cache.get_bytes(url)
+    assert len(body) == size and len(set(body)) == 1, (len(body), set(body))
+print(cache.stats()["hits"])
+"""
+
+
+def test_cache_shared_between_processes(origin, tmp_path):
+    # Writers always download (the body alternates, so never a 304) and
+    # replace the entry while readers take it from disk.
+    size = 1 << 20
+    origin.bodies["/big.csv"] = [b"a" * size, b"b" * size]
+    url = origin.url("/big.csv")
+    env = dict(os.environ)
+    env.pop("HTTP_CACHE_DIR", None)
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", shared_reader, str(tmp_path), url, age, str(size)],
+            env=env,
+            stdout=subprocess.PIPE,
+        )
+        for age in ["0", "0", "1e9", "1e9", "1e9"]
+    ]
+    hits = []
+    for process in processes:
+        output, _ = process.communicate(timeout=60)
+        assert process.returncode == 0
+        hits.append(int(output))
+    assert sum(hits[2:]) > 0
+    (name,) = os.listdir(str(tmp_path))
+    assert not name.endswith(".tmp")
@@ -0,0 +1,118 @@
+"""Figure memoization in apps.figcache, with a disk cache in a temporary dir."""
+import importlib
+import json
+import os
+
+import numpy as np
+import pytest
+
+from apps import encoding, figcache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """figcache reloaded with FIGURE_CACHE_DIR set, restored afterwards."""
+    root = str(tmp_path / "figures")
+    monkeypatch.setenv("FIGURE_CACHE_DIR", root)
+    monkeypatch.setenv("FIGURE_CACHE_MB", "64")
+    importlib.reload(figcache)
+    yield root
+    monkeypatch.undo()
+    importlib.reload(figcache)
+
+
+@pytest.fixture
+def chart(cache_dir):
+    calls = []
+
+    @figcache.memoize("logs.test")
+    def chart(community, threshold):
+        calls.append((community, threshold))
+        return {"data": [{"y": np.array([1.5, 2.5]), "name": community}]}
+
+    chart.calls = calls
+    return chart
+
+
+def test_memoized(chart, cache_dir):
+    figure = chart("Nome", 32)
+    assert figure == {"data": [{"y": [1.5, 2.5], "name": "Nome"}]}
+    assert chart("Nome", 32) == figure
+    assert chart("Nome", 40)["data"][0]["name"] == "Nome"
+    assert chart.calls == [("Nome", 32), ("Nome", 40)]
+
+    key = (figcache.version, encoding.mode, "logs.test", "Nome", 32)
+    assert figcache.memory.peek(key) is not None
+    assert os.path.exists(figcache.disk._path(key))
+
+
+def test_key_includes_version_mode_and_name(chart, monkeypatch):
+    chart("Nome", 32)
+    monkeypatch.setattr(figcache, "version", "2")
+    chart("Nome", 32)
+    monkeypatch.setattr(encoding, "mode", "compact")
+    chart("Nome", 32)
+    assert len(chart.calls) == 3
+
+    @figcache.memoize("logs.other")
+    def other(community, threshold):
+        chart.calls.append("other")
+        return {"data": []}
+
+    assert other("Nome", 32) == {"data": []}
+    assert chart.calls[-1] == "other"
+
+
+def test_uncached(chart, cache_dir):
+    assert chart.uncached("Nome", 32)["data"][0]["y"].dtype == np.float64
+    chart.uncached("Nome", 32)
+    assert len(chart.calls) == 2
+    assert figcache.memory.stats()["entries"] == 0
+    assert os.listdir(cache_dir) == []
+
+
+def test_disk_round_trip(chart):
+    figure = chart("Nome", 32)
+    figcache.memory.clear()
+    assert chart("Nome", 32) == figure
+    assert chart.calls == [("Nome", 32)]
+    assert figcache.stats()["disk"] == {"hits": 1, "misses": 1}
+    # The disk hit is kept in memory for the next call.
+    chart("Nome", 32)
+    assert figcache.stats()["disk"]["hits"] == 1
+
+
+def test_disk_shared_by_another_process(chart, cache_dir):
+    # A fresh module instance stands in for another worker reading the dir.
+    figure = chart("Nome", 32)
+    importlib.reload(figcache)
+    key = (figcache.version, encoding.mode, "logs.test", "Nome", 32)
+    assert json.loads(figcache.get(key)) == figure
+    assert figcache.stats()["disk"]["hits"] == 1
+
+
+def test_prune_removes_least_recently_used(tmp_path):
+    disk = figcache.DiskCache(str(tmp_path), max_bytes=25)
+    for age, key in enumerate(["a", "b", "c"]):
+        disk.set(key, "x" * 10)
+        when = 1000 + age
+        os.utime(disk._path(key), (when, when))
+    # Reading "a" makes it the most recently used.
+    assert disk.get("a") == "x" * 10
+    disk.prune()
+    assert disk.get("b") is None
+    assert disk.get("a") is not None
+    assert disk.get("c") is not None
+    assert sorted(os.listdir(str(tmp_path))) == sorted(
+        os.path.basename(disk._path(key)) for key in "ac"
+    )
+
+
+def test_prune_runs_every_few_writes(tmp_path, monkeypatch):
+    disk = figcache.DiskCache(str(tmp_path), max_bytes=25)
+    monkeypatch.setattr(disk, "prune_every", 4)
+    for key in "abc":
+        disk.set(key, "x" * 10)
+    assert len(os.listdir(str(tmp_path))) == 3
+    disk.set("d", "x" * 10)
+    assert len(os.listdir(str(tmp_path))) == 2
@@ -0,0 +1,134 @@
+"""
+gdd.cumulative_curves against the xarray groupby/cumsum it replaced, and the
+precomputed GDD table against gdd.cumulative_curves.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from apps import benchmarks, datastore, gdd
+
+
+def expected(df, threshold, gcm):
+    """The curves cumulative_gdd.add_traces drew before gdd existed."""
+    import xarray as xr
+
+    minyear, maxyear = gdd.year_ranges[gcm]
+    dx = df.to_xarray()
+    curves = []
+    for i in range(minyear, maxyear - 9, 10):
+        dx_decade = dx.temp[dx["time"].dt.year >= i]
+        dx_decade = dx_decade[dx_decade["time"].dt.year < i + 10]
+        month_day_str = xr.DataArray(
+            dx_decade.indexes["time"].strftime("%m-%d"),
+            coords=dx_decade.coords,
+            name="month_day_str",
+        )
+        dx_mean = dx_decade.groupby(month_day_str).mean()
+        df_pre = dx_mean[dx_mean.values > threshold]
+        df_pre_thresh = df_pre - threshold
+        df_cumsum = df_pre_thresh.cumsum()
+        df_df = df_cumsum.to_dataframe()
+        df_df.at["12-31", "temp"] = df_cumsum.max()
+        curves.append((i, list(df_df.index.values), df_df["temp"].values))
+    return curves
+
+
+def seasonal(days, rng):
+    cycle = 35 - 30 * np.cos(2 * np.pi * (days.dayofyear.values - 15) / 365.25)
+    return cycle + rng.normal(0, 4, len(days))
+
+
+def warm_winter(days, rng):
+    # Above every threshold through 12-31, so the total is already on the curve.
+    return seasonal(days, rng) + 60
+
+
+def gappy(days, rng):
+    temps = seasonal(days, rng)
+    temps[rng.random(len(days)) < 0.1] = np.nan
+    return temps
+
+
+series = {
+    "seasonal": (seasonal, False),
+    "seasonal-noleap": (seasonal, True),
+    "warm-winter": (warm_winter, False),
+    "gappy": (gappy, False),
+}
+
+
+def frame(gcm, kind):
+    make, noleap = series[kind]
+    days = pd.date_range(*benchmarks.periods[gcm], name="time")
+    if noleap:
+        days = days[~((days.month == 2) & (days.day == 29))]
+    rng = np.random.default_rng(sorted(series).index(kind))
+    return pd.DataFrame({"temp": make(days, rng)}, index=days)
+
+
+@pytest.mark.parametrize("threshold", gdd.thresholds)
+@pytest.mark.parametrize(
+    "gcm, kind", [("ERA", kind) for kind in series] + [("GFDL", "seasonal-noleap")]
+)
+def test_matches_xarray_cumsum(gcm, kind, threshold):
+    df = frame(gcm, kind)
+
+    result = gdd.cumulative_curves(df, threshold, gcm)
+    reference = expected(df, threshold, gcm)
+
+    assert [decade for decade, _, _ in result] == [decade for decade, _, _ in reference]
+    for (_, x, y), (_, x_expected, y_expected) in zip(result, reference):
+        assert list(x) == x_expected
+        assert x[-1] == "12-31"
+        np.testing.assert_allclose(y, y_expected, rtol=1e-12, equal_nan=True)
+
+
+def test_decade_never_above_threshold():
+    # The xarray version failed here, taking the max of an empty cumsum.
+    df = frame("ERA", "seasonal")
+    df["temp"] = 0.0
+    for _, x, y in gdd.cumulative_curves(df, 32, "ERA"):
+        assert list(x) == ["12-31"]
+        assert np.isnan(y).all()
+
+
+def test_table_skips_communities_that_failed_to_load(tmp_path):
+    backend = datastore.MemoryBackend()
+    for gcm in datastore.models:
+        backend.add(
+            datastore.data_path("Fairbanks", gcm, "mean"),
+            benchmarks.fixture_csv(gcm, "mean"),
+        )
+    root = str(tmp_path / "gdd")
+    missing = gdd.build_table(root, backend, ["Fairbanks", "Anchorage"])
+    table = gdd.load_table(root)
+
+    assert sorted((name, gcm) for name, gcm, _ in missing) == [
+        ("Anchorage", gcm) for gcm in sorted(datastore.models)
+    ]
+    for gcm in datastore.models:
+        assert table.lookup("Anchorage", gcm, 32) is None
+
+    df = backend.series("Fairbanks", "GFDL", "mean")
+    expected = gdd.cumulative_curves(df, 32, "GFDL")
+    result = table.lookup("Fairbanks", "GFDL", 32)
+    assert [decade for decade, _, _ in result] == [decade for decade, _, _ in expected]
+    for (_, x, y), (_, x_expected, y_expected) in zip(result, expected):
+        assert list(x) == list(x_expected)
+        np.testing.assert_allclose(y, y_expected, rtol=1e-5)
+
+
+def test_table_from_an_older_build_is_rejected(tmp_path):
+    backend = datastore.MemoryBackend()
+    root = str(tmp_path / "gdd")
+    gdd.build_table(root, backend, ["Fairbanks"])
+    meta_path = tmp_path / "gdd" / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    del meta["covered"]
+    meta["version"] = 1
+    meta_path.write_text(json.dumps(meta))
+    with pytest.raises(ValueError, match="rebuild"):
+        gdd.load_table(root)
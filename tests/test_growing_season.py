@@ -0,0 +1,129 @@
+"""growing_season.growing_seasons against the per-year logs.get_max_days_alt."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from apps import growing_season, logs
+
+minyear, maxyear = 1980, 1990
+
+
+def daily(noleap=False):
+    days = pd.date_range("%d-01-01" % minyear, "%d-12-31" % (maxyear - 1))
+    if noleap:
+        days = days[~((days.month == 2) & (days.day == 29))]
+    return days
+
+
+def seasonal(days, rng):
+    cycle = 30 - 20 * np.cos(2 * np.pi * days.dayofyear.values / 365.25)
+    return cycle + rng.normal(0, 3, len(days))
+
+
+def random_temps(days, rng):
+    return rng.normal(35, 10, len(days))
+
+
+def tied_temps(days, rng):
+    # Two values only, so most years have several equally long runs.
+    return rng.choice([20.0, 60.0], len(days))
+
+
+series = {
+    "seasonal": (seasonal, False),
+    "random": (random_temps, False),
+    "ties": (tied_temps, False),
+    "seasonal-noleap": (seasonal, True),
+    "ties-noleap": (tied_temps, True),
+}
+
+
+def expected(df, threshold):
+    years = {}
+    frame = df.reset_index()
+    for year in range(minyear, maxyear):
+        datayear = frame[frame["time"].dt.year == year]
+        try:
+            result = logs.get_max_days_alt(datayear, "Fairbanks", threshold, "ERA")
+        except IndexError:
+            # No day above threshold.
+            years[year] = (0, None, None)
+            continue
+        years[year] = (
+            int(result["ndays"]),
+            result["startdate"],
+            result["enddate"],
+        )
+    return years
+
+
+@pytest.mark.parametrize("threshold", growing_season.thresholds)
+@pytest.mark.parametrize("kind", list(series))
+def test_matches_get_max_days_alt(kind, threshold):
+    make, noleap = series[kind]
+    days = daily(noleap)
+    rng = np.random.default_rng(sorted(series).index(kind))
+    df = pd.DataFrame({"temp": make(days, rng)}, index=pd.Index(days, name="time"))
+
+    result = growing_season.growing_seasons(df, threshold, minyear, maxyear)
+
+    assert {
+        year: (season["ndays"], season["startdate"], season["enddate"])
+        for year, season in result.items()
+    } == expected(df, threshold)
+
+
+def test_year_without_season():
+    days = daily()
+    df = pd.DataFrame({"temp": np.zeros(len(days))}, index=pd.Index(days, name="time"))
+    result = growing_season.growing_seasons(df, 32, minyear, maxyear)
+    assert all(
+        season == {"ndays": 0, "startdate": None, "enddate": None}
+        for season in result.values()
+    )
+
+
+def test_table_skips_communities_that_failed_to_load(tmp_path):
+    from apps import benchmarks, datastore
+
+    backend = datastore.MemoryBackend()
+    for gcm in datastore.models:
+        backend.add(
+            datastore.data_path("Fairbanks", gcm, "min"),
+            benchmarks.fixture_csv(gcm, "min"),
+        )
+    path = str(tmp_path / "seasons.npz")
+    missing = growing_season.build_table(path, backend, ["Fairbanks", "Anchorage"])
+    table = growing_season.load_table(path)
+
+    assert sorted((name, gcm) for name, gcm, _ in missing) == [
+        ("Anchorage", gcm) for gcm in sorted(datastore.models)
+    ]
+    assert table.lookup("Anchorage", "ERA", 32, 1980, 2010) is None
+    df = backend.series("Fairbanks", "ERA", "min")
+    assert table.lookup("Fairbanks", "ERA", 32, 1980, 2010) == (
+        growing_season.growing_seasons(df, 32, 1980, 2010)
+    )
+
+
+def test_table_from_an_older_build_is_rejected(tmp_path):
+    path = str(tmp_path / "seasons.npz")
+    empty = np.zeros((1, 1, 1, 1), dtype=np.int16)
+    meta = {
+        "version": 1,
+        "communities": ["Fairbanks"],
+        "models": ["ERA"],
+        "thresholds": [32],
+        "first_year": 1980,
+    }
+    np.savez(
+        path,
+        meta=np.array(json.dumps(meta)),
+        ndays=empty,
+        startday=empty,
+        endday=empty,
+    )
+    with pytest.raises(ValueError, match="rebuild"):
+        growing_season.load_table(path)
@@ -0,0 +1,72 @@
+"""The load test's simulated visitors and stand-in bucket."""
+import random
+import threading
+
+import requests
+
+from apps import loadtest
+
+
+def visitor():
+    v = loadtest.Visitor(["Fairbanks", "Nome"], random.Random(0))
+    v.state["community"] = "Fairbanks"
+    return v
+
+
+def test_first_render_changes_nothing():
+    (page_output, page), (chart_output, chart) = visitor().first_requests()
+    assert page_output == "page-content"
+    assert page["changedPropIds"] == []
+    assert chart_output == "tcharts"
+    assert chart["changedPropIds"] == []
+    assert chart["inputs"] == [
+        {"id": "community", "property": "value", "value": "Fairbanks"},
+        {"id": "threshold", "property": "value", "value": 32},
+        {"id": "gcm", "property": "value", "value": "GFDL"},
+    ]
+
+
+def test_tab_switch_changes_only_the_tab():
+    (_, page), (_, chart) = visitor().first_requests(switched=True)
+    assert page["changedPropIds"] == ["tabs.value"]
+    assert chart["changedPropIds"] == []
+
+
+def test_control_changes():
+    v = visitor()
+    for _ in range(50):
+        state = dict(v.state)
+        requests_made = v.next_requests()
+        if v.state["tab"] != state["tab"]:
+            assert len(requests_made) == 2
+            continue
+        ((output, body),) = requests_made
+        changed = [name for name in state if v.state[name] != state[name]]
+        assert body["changedPropIds"] == [changed[0] + ".value"]
+        assert output == loadtest.tabs[v.state["tab"]][0]
+
+
+def test_requests_are_accepted(client):
+    # The app's test data covers Fairbanks only, so leave the community be.
+    v = visitor()
+    bodies = v.first_requests() + [v.chart_request(["gcm"])]
+    for tab in ["tab-2", "tab-3"]:
+        v.state["tab"] = tab
+        bodies += v.first_requests(switched=True) + [v.chart_request(["gcm"])]
+    for output, body in bodies:
+        response = client.post("/_dash-update-component", json=body)
+        assert response.status_code == 200, output
+
+
+def test_stand_in_bucket():
+    bucket = loadtest.StandInBucket(("127.0.0.1", 0))
+    threading.Thread(target=bucket.serve_forever, daemon=True).start()
+    try:
+        url = "http://127.0.0.1:%d/" % bucket.server_address[1]
+        response = requests.get(url + "min/Nome_GFDL_min.csv")
+        assert response.status_code == 200
+        assert response.text.startswith("time,temp\n2010-01-01,")
+        assert requests.get(url + "min/Nome_GFDL_min.csv").text == response.text
+        assert requests.get(url + "min/Nome_GFDL_mean.csv").status_code == 404
+    finally:
+        bucket.shutdown()
@@ -0,0 +1,92 @@
+"""The Prometheus text served at /metrics."""
+import os
+import subprocess
+import sys
+
+import flask
+import pytest
+
+from apps import metrics
+
+
+def lines_for(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+@pytest.mark.parametrize(
+    "value, enabled",
+    [("1", True), ("true", True), ("YES", True), ("0", False), ("false", False)],
+)
+def test_metrics_flag(value, enabled):
+    result = subprocess.run(
+        [sys.executable, "-c", "from apps import metrics; print(metrics.enabled)"],
+        env=dict(os.environ, METRICS=value),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == str(enabled)
+
+
+def test_stage_histogram():
+    metrics.observe("compute", 0.003, tab="test")
+    metrics.observe("compute", 0.2, tab="test")
+    metrics.observe("compute", 60, tab="test")
+    text = metrics.render()
+
+    assert "# TYPE usda_dash_stage_seconds histogram" in text
+    labels = 'tab="test",stage="compute"'
+    buckets = lines_for(text, "usda_dash_stage_seconds_bucket{%s," % labels)
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert len(counts) == len(metrics.buckets) + 1
+    assert counts == sorted(counts)
+    assert buckets[0] == 'usda_dash_stage_seconds_bucket{%s,le="0.005"} 1' % labels
+    assert buckets[-1] == 'usda_dash_stage_seconds_bucket{%s,le="+Inf"} 3' % labels
+    assert "usda_dash_stage_seconds_count{%s} 3" % labels in text
+    assert "usda_dash_stage_seconds_sum{%s} 60.203" % labels in text
+
+
+def test_parse_stage():
+    from apps import benchmarks, datastore
+
+    backend = datastore.MemoryBackend()
+    backend.add(
+        datastore.data_path("Fairbanks", "ERA", "min"),
+        benchmarks.fixture_csv("ERA", "min"),
+    )
+    with metrics.tab("parse-test"):
+        backend.series("Fairbanks", "ERA", "min")
+    histogram = metrics.histograms()[("parse-test", "parse")]
+    assert sum(histogram["counts"]) == 1
+    assert histogram["sum"] > 0
+
+
+def test_task_histogram():
+    metrics.observe_task("test.ERA", 0.02)
+    text = metrics.render()
+    assert "# TYPE usda_dash_task_seconds histogram" in text
+    assert 'usda_dash_task_seconds_count{task="test.ERA"} 1' in text
+
+
+def test_cache_statistics_types():
+    text = metrics.render()
+    assert "# TYPE usda_dash_data_cache_hits_total counter" in text
+    assert "# TYPE usda_dash_data_cache_evictions_total counter" in text
+    assert "# TYPE usda_dash_data_loads_deduplicated_total counter" in text
+    assert "# TYPE usda_dash_data_loads_loads_total counter" in text
+    assert "# TYPE usda_dash_data_loads_flights_total counter" in text
+    assert "# TYPE usda_dash_data_cache_entries gauge" in text
+    assert "# TYPE usda_dash_data_loads_in_flight gauge" in text
+    # Every sample follows the TYPE line for its metric.
+    for line in lines_for(text, "# TYPE usda_dash_data"):
+        metric = line.split()[2]
+        assert lines_for(text, metric + " ")
+
+
+def test_route():
+    server = flask.Flask(__name__)
+    metrics.register(server)
+    response = server.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert b"usda_dash_stage_seconds" in response.data
@@ -0,0 +1,84 @@
+"""Partial figure updates when only the model radio changes."""
+import pytest
+
+from apps import annual_min, benchmarks, cumulative_gdd, logs, patches
+
+charts = {
+    "tcharts": (logs, {"threshold": 32}),
+    "acharts": (annual_min, {}),
+    "ccharts": (cumulative_gdd, {"threshold": 32}),
+}
+
+
+def update(client, output, gcm, changed, **inputs):
+    values = dict(community=benchmarks.community, **inputs, gcm=gcm)
+    response = client.post(
+        "/_dash-update-component",
+        json={
+            "output": output + ".figure",
+            "outputs": {"id": output, "property": "figure"},
+            "inputs": [
+                {"id": name, "property": "value", "value": value}
+                for name, value in values.items()
+            ],
+            "changedPropIds": [name + ".value" for name in changed],
+            "state": [],
+        },
+    )
+    assert response.status_code == 200
+    return response.get_json()["response"][output]["figure"]
+
+
+@pytest.mark.parametrize("output", list(charts))
+def test_gcm_change_sends_projected_traces(client, output):
+    module, inputs = charts[output]
+    full = update(client, output, "NCAR", [], **inputs)
+    patch = update(client, output, "NCAR", ["gcm"], **inputs)
+
+    assert "__dash_patch_update" in patch
+    operations = [
+        (operation["operation"], operation["location"])
+        for operation in patch["operations"]
+    ]
+    projected = range(module.historical_count, len(full["data"]))
+    assert operations == [("Assign", ["data", i]) for i in projected] + [
+        ("Assign", ["layout", "title"])
+    ]
+    values = [operation["params"]["value"] for operation in patch["operations"]]
+    assert values[:-1] == full["data"][module.historical_count :]
+    assert values[-1] == full["layout"]["title"]
+
+
+@pytest.mark.parametrize("output", list(charts))
+@pytest.mark.parametrize(
+    "changed",
+    [[], ["community"], ["community", "gcm"]],
+    ids=["initial", "community", "both"],
+)
+def test_other_changes_send_whole_figure(client, output, changed):
+    module, inputs = charts[output]
+    figure = update(client, output, "GFDL", changed, **inputs)
+    assert "__dash_patch_update" not in figure
+    assert len(figure["data"]) > module.historical_count
+
+
+def test_threshold_change_sends_whole_figure(client):
+    figure = update(client, "tcharts", "GFDL", ["threshold"], threshold=40)
+    assert "__dash_patch_update" not in figure
+
+
+def test_outside_a_callback():
+    assert patches.only_changed("gcm") is False
+
+
+def test_replace_traces():
+    patched = patches.replace_traces(2, [{"name": "a"}, {"name": "b"}], "title")
+    operations = patched.to_plotly_json()["operations"]
+    assert [
+        (operation["location"], operation["params"]["value"])
+        for operation in operations
+    ] == [
+        (["data", 2], {"name": "a"}),
+        (["data", 3], {"name": "b"}),
+        (["layout", "title"], "title"),
+    ]
@@ -0,0 +1,80 @@
+"""The binary stores written by apps.preprocess and their backends."""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from apps import benchmarks, datastore, preprocess
+
+names = ["Fairbanks", "Fort Yukon", "Nome"]
+
+
+@pytest.fixture(scope="module")
+def source():
+    """Fairbanks complete, Fort Yukon absent and Nome's ERA min not daily."""
+    backend = datastore.MemoryBackend()
+    for seed, gcm in enumerate(datastore.models):
+        for variable in datastore.variables:
+            csv = benchmarks.fixture_csv(gcm, variable, seed)
+            backend.add(datastore.data_path("Fairbanks", gcm, variable), csv)
+            if (gcm, variable) == ("ERA", "min"):
+                frame = pd.read_csv(io.StringIO(csv))
+                csv = frame.drop(index=[100, 200]).to_csv(index=False)
+            backend.add(datastore.data_path("Nome", gcm, variable), csv)
+    return backend
+
+
+def test_cube(source, tmp_path):
+    root = str(tmp_path / "cube")
+    written, missing = preprocess.build_cube(root, source, names, workers=2)
+
+    expected_missing = [
+        ("Fort Yukon", gcm, variable)
+        for gcm in datastore.models
+        for variable in datastore.variables
+    ]
+    expected_missing.append(("Nome", "ERA", "min"))
+    assert sorted(job[:3] for job in missing) == sorted(expected_missing)
+    assert dict((job[:3], job[3]) for job in missing)[("Nome", "ERA", "min")] == (
+        "is not a daily series"
+    )
+    assert written == 2 * len(datastore.models) * len(datastore.variables) - 1
+
+    cube = datastore.CubeBackend(root)
+    for gcm in datastore.models:
+        for variable in datastore.variables:
+            with pytest.raises(FileNotFoundError):
+                cube.series("Fort Yukon", gcm, variable)
+            expected = source.series("Fairbanks", gcm, variable)
+            result = cube.series("Fairbanks", gcm, variable)
+            assert result.index.equals(expected.index)
+            np.testing.assert_allclose(result["temp"], expected["temp"], rtol=1e-6)
+    with pytest.raises(FileNotFoundError):
+        cube.series("Nome", "ERA", "min")
+    assert not cube.series("Nome", "ERA", "mean")["temp"].isna().any()
+
+
+def test_cube_from_older_preprocess_is_rejected(source, tmp_path):
+    root = str(tmp_path / "cube")
+    preprocess.build_cube(root, source, ["Fairbanks"], workers=2)
+    path = tmp_path / "cube" / "cube.json"
+    meta = json.loads(path.read_text())
+    meta["version"] = 1
+    path.write_text(json.dumps(meta))
+    with pytest.raises(ValueError):
+        datastore.CubeBackend(root)
+
+
+def test_columnar(source, tmp_path):
+    root = str(tmp_path / "columnar")
+    written, missing = preprocess.build_columnar(root, source, names, workers=2)
+    assert ("Nome", "ERA", "min") in [job[:3] for job in missing]
+
+    columnar = datastore.ColumnarBackend(root)
+    with pytest.raises(FileNotFoundError):
+        columnar.series("Fort Yukon", "ERA", "min")
+    expected = source.series("Fairbanks", "GFDL", "mean")
+    result = columnar.series("Fairbanks", "GFDL", "mean")
+    np.testing.assert_allclose(result["temp"], expected["temp"], rtol=1e-6)
@@ -0,0 +1,122 @@
+"""Saving profiles of slow callback requests, and access to them at /_profiles."""
+import time
+
+import flask
+import pytest
+
+from apps import executor, profiler
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "token", "secret")
+    server = flask.Flask(__name__)
+    profiler.register(server, str(tmp_path))
+    profiler.Store(str(tmp_path)).save(
+        {"output": "tcharts.figure", "folded": "a;b 1\n"}
+    )
+    return server.test_client()
+
+
+def profile_name(client):
+    return client.get("/_profiles?token=secret").get_json()[0]["name"]
+
+
+@pytest.mark.parametrize(
+    "query, headers",
+    [("", {}), ("?token=wrong", {}), ("", {"X-Profile-Token": "wrong"})],
+    ids=["none", "wrong-query", "wrong-header"],
+)
+def test_token_required(client, query, headers):
+    name = profile_name(client)
+    assert client.get("/_profiles" + query, headers=headers).status_code == 403
+    assert client.get("/_profiles/" + name + query, headers=headers).status_code == 403
+
+
+def test_token_accepted(client):
+    name = profile_name(client)
+    listing = client.get("/_profiles", headers={"X-Profile-Token": "secret"})
+    assert listing.status_code == 200
+    assert "folded" not in listing.get_json()[0]
+    folded = client.get("/_profiles/%s?token=secret&format=folded" % name)
+    assert folded.status_code == 200
+    assert folded.data == b"a;b 1\n"
+
+
+def test_non_ascii_token_is_rejected(client):
+    assert client.get("/_profiles?token=sécret").status_code == 403
+
+
+def test_no_token_configured(client, monkeypatch):
+    name = profile_name(client)
+    monkeypatch.setattr(profiler, "token", None)
+    assert client.get("/_profiles").status_code == 404
+    assert client.get("/_profiles/" + name).status_code == 404
+    assert client.get("/_profiles?token=").status_code == 404
+
+
+def test_unknown_profiles(client):
+    assert client.get("/_profiles/missing.json?token=secret").status_code == 404
+    assert client.get("/_profiles/..%2Fsecret.json?token=secret").status_code == 404
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def request_work(seconds):
+    spin(seconds)
+
+
+def pool_work(seconds):
+    spin(seconds)
+
+
+def test_slow_request_is_saved(tmp_path, monkeypatch):
+    if executor.pool is None:
+        pytest.skip("CHART_WORKERS=0 runs no pool tasks")
+    monkeypatch.setattr(profiler, "slow_seconds", 0.2)
+    monkeypatch.setattr(profiler, "sample_rate", 0)
+    monkeypatch.setattr(profiler, "interval", 0.002)
+    server = flask.Flask(__name__)
+    profiler.register(server, str(tmp_path))
+
+    @server.route("/_dash-update-component", methods=["POST"])
+    def update():
+        seconds = flask.request.get_json()["inputs"][0]["value"]
+        executor.run_all(
+            [
+                ("request", request_work, (seconds,)),
+                ("pool", pool_work, (seconds,)),
+            ]
+        )
+        return flask.jsonify({"response": {}})
+
+    def post(seconds):
+        body = {
+            "output": "tcharts.figure",
+            "inputs": [{"id": "seconds", "property": "value", "value": seconds}],
+            "state": [{"id": "units", "property": "value", "value": "F"}],
+        }
+        assert client.post("/_dash-update-component", json=body).status_code == 200
+
+    client = server.test_client()
+    post(0)
+    assert profiler.Store(str(tmp_path)).names() == []
+
+    post(0.4)
+    store = profiler.Store(str(tmp_path))
+    (name,) = store.names()
+    record = store.load(name)
+    assert record["output"] == "tcharts.figure"
+    assert record["inputs"] == {"seconds": 0.4, "units": "F"}
+    assert record["reason"] == "slow"
+    assert record["seconds"] >= 0.4
+    assert record["samples"] > 0
+    stacks = record["folded"].splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in stacks) == record["samples"]
+    assert any(":request_work;" in line for line in stacks)
+    # Stacks sampled from the pool thread running the other task.
+    assert any(":pool_work;" in line and ":update;" not in line for line in stacks)
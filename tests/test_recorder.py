@@ -0,0 +1,141 @@
+"""The JSONL lines written by apps.recorder, and reading them for replay."""
+import json
+
+import flask
+import pytest
+
+from apps import recorder, replay
+
+body = {
+    "output": "tcharts.figure",
+    "outputs": {"id": "tcharts", "property": "figure"},
+    "inputs": [{"id": "community", "property": "value", "value": "Nome"}],
+    "changedPropIds": ["community.value"],
+    "state": [],
+}
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "capture.jsonl")
+
+
+@pytest.fixture
+def client(log_path):
+    server = flask.Flask(__name__)
+
+    @server.route("/_dash-update-component", methods=["POST"])
+    def update():
+        if flask.request.get_json()["inputs"][0]["value"] == "fail":
+            raise RuntimeError("callback failed")
+        return flask.jsonify({"response": {"ok": True}})
+
+    @server.route("/other")
+    def other():
+        return "not a callback"
+
+    recorder.register(server, log_path)
+    return server.test_client()
+
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_line_shape(client, log_path):
+    response = client.post("/_dash-update-component", json=body)
+    (line,) = read_lines(log_path)
+
+    assert sorted(line) == [
+        "body",
+        "bytes",
+        "error",
+        "output",
+        "seconds",
+        "status",
+        "time",
+    ]
+    assert line["output"] == "tcharts.figure"
+    assert line["body"] == body
+    assert line["status"] == 200
+    assert line["bytes"] == len(response.data)
+    assert line["error"] is None
+    assert 0 <= line["seconds"] < 10
+    assert line["time"] > 1.6e9
+
+
+def test_only_callbacks_are_recorded(client, log_path):
+    client.get("/other")
+    client.post("/_dash-update-component", json=body)
+    client.post("/_dash-update-component", json=body)
+    assert len(read_lines(log_path)) == 2
+
+
+def test_failed_callback(client, log_path):
+    failing = dict(body, inputs=[dict(body["inputs"][0], value="fail")])
+    assert client.post("/_dash-update-component", json=failing).status_code == 500
+    (line,) = read_lines(log_path)
+    assert line["status"] == 500
+    assert "callback failed" in line["error"]
+
+
+def test_appends_to_existing_log(client, log_path):
+    with open(log_path, "w") as f:
+        f.write(json.dumps({"time": 0, "output": "old", "seconds": 0.1}) + "\n")
+    client.post("/_dash-update-component", json=body)
+    assert [line["output"] for line in read_lines(log_path)] == [
+        "old",
+        "tcharts.figure",
+    ]
+
+
+def test_replay_reads_the_log(client, log_path):
+    for _ in range(3):
+        client.post("/_dash-update-component", json=body)
+    records = replay.read_log(log_path)
+    results = replay.by_output(records)
+    assert list(results) == ["tcharts.figure"]
+    assert len(results["tcharts.figure"]["latencies"]) == 3
+    assert results["tcharts.figure"]["errors"] == 0
+
+
+@pytest.fixture
+def live_url(client):
+    import threading
+
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, client.application, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:%d" % server.server_port
+    server.shutdown()
+
+
+def test_replay_skips_malformed_lines(live_url, log_path):
+    records = [
+        {"time": 0, "output": "old", "seconds": 0.1},
+        {"time": 1, "output": "tcharts.figure", "body": body},
+        {"output": "tcharts.figure", "body": body},
+        "not a record",
+        {"time": 2, "output": "tcharts.figure", "body": body},
+    ]
+    results = replay.replay(records, live_url, speed=0, concurrency=2)
+    assert len(results) == 2
+    assert all(result["status"] == 200 for result in results)
+
+    rows = replay.diff(records, results + [None])
+    assert rows["tcharts.figure"][1]["requests"] == 2
+    assert rows["old"][1] is None
+
+
+def test_replay_records_send_errors():
+    from apps.loadtest import free_port
+
+    records = [{"time": 0, "output": "tcharts.figure", "body": body}]
+    (result,) = replay.replay(
+        records, "http://127.0.0.1:%d" % free_port(), speed=0, concurrency=1
+    )
+    assert result["status"] == 0
+    assert "Connection" in result["error"]
+    assert replay.by_output([result])["tcharts.figure"]["errors"] == 1
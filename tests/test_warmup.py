@@ -0,0 +1,35 @@
+"""The charts apps.warmup renders ahead of the first visitors."""
+from apps import encoding, figcache, warmup
+
+
+def test_projected_traces_are_warmed(client):
+    from apps import annual_min, cumulative_gdd, logs
+
+    names = {
+        (chart.__module__, chart.__name__, args)
+        for _, chart, args in warmup.jobs(["Fairbanks"])
+    }
+    for gcm in warmup.gcms:
+        for module in (logs, cumulative_gdd):
+            for threshold in (32, 50):
+                args = ("Fairbanks", threshold, gcm)
+                assert (module.__name__, "build_chart", args) in names
+                assert (module.__name__, "projected_traces", args) in names
+        args = ("Fairbanks", gcm)
+        assert (annual_min.__name__, "projected_traces", args) in names
+
+    figcache.memory.clear()
+    results = warmup.warm(["Fairbanks"], report=None)
+    assert [error for _, _, _, error in results if error] == []
+    key = (figcache.version, encoding.mode, "annual_min.projected")
+    assert figcache.memory.peek(key + ("Fairbanks", "NCAR")) is not None
+
+
+def test_background_warmup_logs(client, caplog, capsys):
+    with caplog.at_level("DEBUG", logger=warmup.log.name):
+        warmup.start_background("Fairbanks, ").join(60)
+    assert capsys.readouterr().out == ""
+    levels = [record.levelname for record in caplog.records]
+    assert levels.count("INFO") == 1
+    assert levels.count("DEBUG") == len(list(warmup.jobs(["Fairbanks"])))
+    assert caplog.records[-1].getMessage().startswith("warmed ")